@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import config
+
+
+class AjaxError(RuntimeError):
+    pass
+
+
+class AjaxClient(object):
+    """pooled keep-alive session for ajax.php endpoints (shares cookies and token with browser)"""
+
+    def __init__(self, host: str, ajax_token: str, cookies=None, user_agent=None):
+        self.host = host.rstrip('/')
+        self.ajax_token = ajax_token
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.AJAX_POOL_SIZE)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'X-Requested-With': 'XMLHttpRequest'})
+        if user_agent:
+            self.session.headers.update({'User-Agent': user_agent})
+        for c in cookies or []:
+            self.session.cookies.set(c['name'], c['value'], domain=c.get('domain'), path=c.get('path', '/'))
+
+    @classmethod
+    def from_driver(cls, driver, host: str, ajax_token: str):
+        user_agent = driver.execute_script('return navigator.userAgent;')
+        return cls(host, ajax_token, driver.get_cookies(), user_agent)
+
+    def close(self):
+        self.session.close()
+
+    def call(self, cmd: str, data: dict) -> dict:
+        payload = dict(data)
+        payload['cmd'] = cmd
+        payload['ajaxToken'] = self.ajax_token
+        logging.debug('ajax call %s %s', cmd, data)
+        try:
+            response = self.session.post('%s/ajax.php' % self.host, params={'cmd': cmd}, data=payload,
+                                         timeout=config.REQUEST_TIMEOUT)
+            response.raise_for_status()
+            result = response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise AjaxError('ajax %s error %s' % (cmd, e))
+
+        if 'response' not in result or result['response'].get('error'):
+            raise AjaxError('ajax %s invalid response %s' % (cmd, result.get('response', result)))
+        return result
+
+    def map_position_data(self, x: int, y: int, zoom_level: int = 3) -> dict:
+        return self.call('mapPositionData', {
+            'data[x]': x,
+            'data[y]': y,
+            'data[zoomLevel]': zoom_level,
+        })
+
+    def tile_details(self, x: int, y: int) -> dict:
+        return self.call('viewTileDetails', {'x': x, 'y': y})
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""choose auction bids within silver budget"""
+
+import logging
+from functools import reduce
+from math import gcd
+
+
+def match_bid(name: str, bids: dict):
+    """unit bid for item name, longest pattern wins (Small Bandage before Bandage)"""
+    for pattern in sorted(bids, key=len, reverse=True):
+        if pattern in name:
+            return pattern, bids[pattern]
+    return None, None
+
+
+def bid_candidates(rows, bids: dict):
+    """auction rows worth bidding: {row, pattern, bid, value}, value is configured worth above current price"""
+    result = []
+    for row in rows:
+        pattern, unit_bid = match_bid(row['name'], bids)
+        if not pattern or row['price'] is None or not row['bid_link']:
+            continue
+        if row['price'] / row['count'] >= unit_bid:
+            continue
+        bid = unit_bid * row['count']
+        result.append({'row': row, 'pattern': pattern, 'bid': bid, 'value': bid - row['price']})
+    return result
+
+
+def plan_bids(rows, bids: dict, silver: int):
+    """0/1 knapsack: subset of candidates with max total value whose max bids fit into silver"""
+    candidates = [c for c in bid_candidates(rows, bids) if c['bid'] <= silver]
+    if not candidates:
+        return []
+
+    # bids are multiples of unit prices - shrink table by common divisor
+    step = reduce(gcd, [c['bid'] for c in candidates])
+    capacity = silver // step
+    weights = [c['bid'] // step for c in candidates]
+
+    best = [0] * (capacity + 1)
+    taken = []
+    for i, c in enumerate(candidates):
+        keep = bytearray(capacity + 1)
+        w = weights[i]
+        for cap in range(capacity, w - 1, -1):
+            value = best[cap - w] + c['value']
+            if value > best[cap]:
+                best[cap] = value
+                keep[cap] = 1
+        taken.append(keep)
+
+    plan = []
+    cap = capacity
+    for i in range(len(candidates) - 1, -1, -1):
+        if taken[i][cap]:
+            plan.append(candidates[i])
+            cap -= weights[i]
+    plan.reverse()
+    logging.info('auction plan: %d candidates, %d bids for %d of %d silver, value %d', len(candidates), len(plan),
+                 sum(c['bid'] for c in plan), silver, sum(c['value'] for c in plan))
+    return plan
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""compare default and tuned chrome profiles on pages the bot visits most
+
+usage: python -m benchmarks.bench_driver [rounds]
+needs chromedriver, HOST and CREDS of a live server
+"""
+
+import statistics
+import sys
+import time
+
+import config
+from driver_factory import process_tree_rss_mb
+from manage import Manager
+
+PROFILES = [
+    ('default', {'headless': False, 'page_load_strategy': 'normal', 'block_resources': False, 'profile_dir': ''}),
+    ('tuned', {}),  # DRIVER_* settings from config
+]
+
+
+def bench_profile(options, rounds):
+    m = Manager(*config.CREDS, driver_options=options)
+    pages = {
+        'dorf1': m.MAIN_PAGE,
+        'dorf2': m.VILLAGE_PAGE,
+        'farm list': config.HOST + '/build.php?tt=99&id=39',
+        'hero': m.HERO_PAGE,
+    }
+    timings = {name: [] for name in pages}
+    try:
+        for _ in range(rounds):
+            for name, url in pages.items():
+                started = time.time()
+                m.driver.get(url)
+                m.wait.page_ready()
+                timings[name].append(time.time() - started)
+        rss = process_tree_rss_mb(m.driver.service.process.pid)
+    finally:
+        m.close()
+    return {name: statistics.mean(values) for name, values in timings.items()}, rss
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    results = [(name, bench_profile(options, rounds)) for name, options in PROFILES]
+    for name, (timings, rss) in results:
+        print('%-8s %s | avg %.2f sec | browser rss %.0f MB' % (
+            name, ', '.join('%s %.2f' % i for i in timings.items()), statistics.mean(timings.values()), rss))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""compare single-pass map parser with legacy per-tile regex parsing
+
+usage: python -m benchmarks.bench_map_parser
+"""
+
+import re
+import timeit
+from json import loads
+
+from benchmarks.fixtures import map_response
+from map_parser import parse_map_tiles
+
+
+def legacy_extract_players_from_source(source):
+    map_dict = loads(source)
+    players = [i for i in map_dict['response']['data']['tiles'] if 'u' in i]
+    result = []
+    for p in players:
+        try:
+            inh = int(re.findall(r'\{k\.einwohner\}\s*(\d+)<br\s+/>', p['t'])[0])
+        except IndexError:
+            continue
+        ally = re.findall(r'\{k\.allianz\}\s*(.+)<br\s+/>\{k\.volk\}', p['t'])[0].strip()
+        race_num = int(re.findall(r'\{k\.volk\}\s*\{a\.v(\d{1})\}', p['t'])[0].strip())
+        name = re.findall(r'\{k\.spieler\}\s*(.+)<br\s+/>\{k\.einwohner\}', p['t'])[0].strip()
+        village_name = re.findall(r'\{k\.dt\}\s*(.*)', p['c'])[0].strip()
+        result.append({'x': int(p['x']), 'y': int(p['y']), 'id': int(p['u']), 'ally': ally, 'name': name,
+                       'race': race_num, 'inh': inh, 'v_name': village_name})
+    return result
+
+
+def legacy_extract_free_oases_from_source(source):
+    map_dict = loads(source)
+    return [(int(i['x']), int(i['y'])) for i in map_dict['response']['data']['tiles']
+            if 'd' in i and 't' in i and 'u' not in i and i['d'] == -1 and ('25%' in i['t'] or '50%' in i['t'])]
+
+
+def legacy(source):
+    return legacy_extract_players_from_source(source), legacy_extract_free_oases_from_source(source)
+
+
+def current(source):
+    tiles = parse_map_tiles(source)
+    return tiles.players, tiles.free_oases
+
+
+def main():
+    for size in (31, 101, 201):
+        source = map_response(size)
+        assert legacy(source) == current(source), 'parsers disagree on %d' % size
+        number = max(1, 2000 // size)
+        legacy_time = min(timeit.repeat(lambda: legacy(source), number=number, repeat=5)) / number
+        current_time = min(timeit.repeat(lambda: current(source), number=number, repeat=5)) / number
+        print('%dx%d tiles (%d KB): legacy %.2f ms, single pass %.2f ms, speedup x%.2f' % (
+            size, size, len(source) // 1024, legacy_time * 1000, current_time * 1000, legacy_time / current_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""vectorized travel engine against per-pair map_distance over full 401x401 map
+
+usage: python -m benchmarks.bench_travel
+"""
+
+import random
+import timeit
+
+import numpy as np
+
+import config
+from map_grid import map_distance
+from travel import distance_matrix, travel_hours, unit_speed
+
+
+def main():
+    side = 2 * config.MAP_RADIUS + 1
+    coords = np.arange(-config.MAP_RADIUS, config.MAP_RADIUS + 1)
+    xs, ys = np.meshgrid(coords, coords)
+    targets = np.stack([xs.ravel(), ys.ravel()], axis=1)
+    rnd = random.Random(1)
+    villages = [(rnd.randint(-config.MAP_RADIUS, config.MAP_RADIUS), rnd.randint(-config.MAP_RADIUS, config.MAP_RADIUS))
+                for _ in range(20)]
+    speed = unit_speed('t4')
+
+    def vectorized(origins):
+        return travel_hours(distance_matrix(origins, targets), speed, 2.)
+
+    def legacy(origins):
+        result = []
+        for vx, vy in origins:
+            row = []
+            for tx, ty in targets.tolist():
+                distance = map_distance(vx, vy, tx, ty)
+                near = min(distance, config.TOURNAMENT_SQUARE_DISTANCE)
+                row.append(near / speed + (distance - near) / (speed * 2.))
+            result.append(row)
+        return result
+
+    assert np.allclose(vectorized(villages[:1]), legacy(villages[:1])), 'engines disagree'
+
+    for count in (1, 20):
+        origins = villages[:count]
+        pairs = count * side * side
+        vectorized_time = min(timeit.repeat(lambda: vectorized(origins), number=1, repeat=3))
+        legacy_time = min(timeit.repeat(lambda: legacy(origins), number=1, repeat=1))
+        print('%d villages x %dx%d map (%d pairs): per-pair %.0f ms, vectorized %.1f ms, speedup x%.0f' % (
+            count, side, side, pairs, legacy_time * 1000, vectorized_time * 1000, legacy_time / vectorized_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""deterministic generators of server responses in recorded format"""
+
+import json
+import random
+
+
+def map_tile(rnd: random.Random, x: int, y: int):
+    kind = rnd.random()
+    if kind < 0.15:
+        return {
+            'x': str(x), 'y': str(y), 'd': rnd.randint(1000, 99999), 'u': rnd.randint(1, 5000),
+            'c': '{k.dt} Village %d' % rnd.randint(1, 999),
+            't': '{k.spieler} player%d<br />{k.einwohner} %d<br />{k.allianz} %s<br />{k.volk} {a.v%d}' % (
+                rnd.randint(1, 5000), rnd.randint(1, 900), rnd.choice(['', 'ally1', 'ally2', 'NPC']),
+                rnd.randint(1, 5)),
+        }
+    if kind < 0.2:
+        return {
+            'x': str(x), 'y': str(y), 'd': -1, 'u': rnd.randint(1, 5000), 'c': '{k.bt}',
+            't': '{k.spieler} player%d<br />{k.allianz} ally1<br />{a:r%d} {a.r%d} 25%%' % (
+                rnd.randint(1, 5000), rnd.randint(1, 4), rnd.randint(1, 4)),
+        }
+    if kind < 0.3:
+        return {
+            'x': str(x), 'y': str(y), 'd': -1, 'c': '{k.fo}',
+            't': '{a:r%d} {a.r%d} %s%%' % (rnd.randint(1, 4), rnd.randint(1, 4), rnd.choice(['25', '50'])),
+        }
+    if kind < 0.6:
+        return {'x': str(x), 'y': str(y), 'd': rnd.randint(1000, 99999), 't': '{k.vt} {k.f%d}' % rnd.randint(1, 12)}
+    return {'x': str(x), 'y': str(y)}
+
+
+def map_response(size: int = 31, seed: int = 1, center=(0, 0)) -> str:
+    rnd = random.Random(seed)
+    half = size // 2
+    tiles = [map_tile(rnd, center[0] + dx, center[1] + dy)
+             for dy in range(-half, half + 1) for dx in range(-half, half + 1)]
+    return json.dumps({'response': {'error': False, 'errorMsg': None, 'data': {'tiles': tiles}}})
+
+
+NATURE_TROOPS = ['Rat', 'Spider', 'Snake', 'Bat', 'Wild Boars', 'Wolves', 'Bear', 'Crocodile', 'Tiger', 'Elephant']
+REPORT_ALTS = ['Won as attacker without losses.', 'Won as attacker with losses.', 'Lost as attacker with losses.']
+
+
+def tile_details_response(seed: int = 1, troop_types: int = 4) -> str:
+    """ajax viewTileDetails of oasis with nature troops"""
+    rnd = random.Random(seed)
+    rows = ''.join('<tr><td class="ico"><img class="unit u3%d" /></td><td class="val">%d</td>'
+                   '<td class="desc">%s</td></tr>' % (i, rnd.randint(1, 60), rnd.choice(NATURE_TROOPS))
+                   for i in range(troop_types))
+    html = ('<div id="tileDetails"><h1>Unoccupied oasis</h1><table id="troop_info" class="transparent">'
+            '<tbody>%s</tbody></table></div>' % rows)
+    return json.dumps({'response': {'error': False, 'errorMsg': None, 'data': {'html': html}}})
+
+
+def farm_slot_row(rnd: random.Random, slot_id: int) -> str:
+    x, y = rnd.randint(-200, 200), rnd.randint(-200, 200)
+    state = rnd.random()
+    last_raid = ''
+    if state < 0.8:
+        alt = rnd.choice(REPORT_ALTS)
+        day = 'today' if rnd.random() < 0.7 else '14.06.20'
+        last_raid = ('<img class="iReport iReport%d" alt="%s" /><a href="berichte.php?id=%d">%s, %02d:%02d</a>%s' % (
+            REPORT_ALTS.index(alt) + 1, alt, rnd.randint(1, 10 ** 7), day, rnd.randint(0, 11), rnd.randint(0, 59),
+            '<img class="carry full" alt="carry full" />' if rnd.random() < 0.4 else
+            '<img class="carry half" alt="carry half" />'))
+    if rnd.random() < 0.1:
+        last_raid += '<img class="att2" alt="Own attacking troops" />'
+    return ('<tr class="slotRow"><td class="checkbox"><input type="checkbox" id="slot%d" name="slot[%d]" /></td>'
+            '<td class="village"><a href="karte.php?x=%d&amp;y=%d">Village %d</a></td>'
+            '<td class="ew">%d</td><td class="distance">%.1f</td><td class="troops">10</td>'
+            '<td class="lastRaid">%s</td></tr>' % (
+                slot_id, slot_id, x, y, slot_id, rnd.randint(2, 900), rnd.uniform(1, 40), last_raid))
+
+
+def farm_list_page(lists: int = 2, slots: int = 100, seed: int = 1) -> str:
+    rnd = random.Random(seed)
+    entries = []
+    for list_id in range(lists):
+        rows = ''.join(farm_slot_row(rnd, list_id * slots + i) for i in range(slots))
+        entries.append(
+            '<div id="list%d" class="listEntry"><div class="listTitle"><div class="listTitleText">farm %d</div></div>'
+            '<div class="addSlot"><button value="add">add</button><span class="raidListSlotCount">%d/%d</span></div>'
+            '<table class="list"><tbody>%s</tbody></table></div>' % (list_id, list_id, slots, max(slots, 100), rows))
+    return '<html><body><div id="raidList">%s</div></body></html>' % ''.join(entries)
+
+
+def farm_slot_rows(count: int = 100, seed: int = 1):
+    rnd = random.Random(seed)
+    return [farm_slot_row(rnd, i) for i in range(count)]
+
+
+def report_page(seed: int = 1) -> str:
+    rnd = random.Random(seed)
+    troops = [rnd.randint(0, 50) for _ in range(10)]
+    casualties = [rnd.randint(0, t) if rnd.random() < 0.2 else 0 for t in troops]
+    units = lambda values: ''.join('<td class="unit">%d</td>' % v for v in values)
+    bounty = ''.join('<div class="res"><i class="r%d"></i>%d</div>' % (i, rnd.randint(0, 800)) for i in range(1, 5))
+    return (
+        '<html><body><div id="time">%02d.%02d.20, %02d:%02d:%02d</div>'
+        '<table id="attacker"><thead><tr><td><a href="spieler.php?uid=1">attacker</a></td></tr></thead><tbody>'
+        '<tr><th>Troops</th>%s</tr><tr><th>Casualties</th>%s</tr><tr><th>Bounty</th><td>%s%s</td></tr>'
+        '</tbody></table><table class="defender"><tr><td><a href="karte.php?x=%d&amp;y=%d">village</a></td></tr>'
+        '</table></body></html>' % (
+            rnd.randint(1, 28), rnd.randint(1, 12), rnd.randint(0, 23), rnd.randint(0, 59), rnd.randint(0, 59),
+            units(troops), units(casualties), bounty, ' carry full' if rnd.random() < 0.4 else '',
+            rnd.randint(-200, 200), rnd.randint(-200, 200)))
+
+
+def reports_overview_page(rows: int = 20, seed: int = 1) -> str:
+    rnd = random.Random(seed)
+    trs = []
+    for i in range(rows):
+        report_class = rnd.randint(1, 3)
+        trs.append('<tr><td class="sel"><input type="checkbox" name="n%d" /></td><td class="sub">'
+                   '<img class="iReport iReport%d" alt="%s" /><a href="berichte.php?id=%d">village attacks farm</a>'
+                   '</td><td class="dat">today, %02d:%02d</td></tr>' % (
+                       i, report_class, REPORT_ALTS[report_class - 1], 10 ** 6 + i, rnd.randint(0, 23),
+                       rnd.randint(0, 59)))
+    return ('<html><body><form id="reportsForm"><table id="overview"><thead><tr><th>subject</th></tr></thead>'
+            '<tbody>%s</tbody></table></form></body></html>' % ''.join(trs))
+
+
+def auction_page(rows: int = 20, seed: int = 1) -> str:
+    rnd = random.Random(seed)
+    items = ['Ointment', 'Small Bandage', 'Bandage', 'Cage', 'Scroll']
+    trs = ''.join(
+        '<tr><td class="icon"></td><td class="name">%d‬×‬ %s</td><td class="silver">%d</td>'
+        '<td class="time"><span class="timer" value="%d">0:10:00</span></td>'
+        '<td class="bid"><a href="hero.php?t=4&amp;action=buy&amp;a=%d">bid</a></td></tr>' % (
+            rnd.randint(1, 100), rnd.choice(items), rnd.randint(10, 2000), rnd.randint(1, 86400), i)
+        for i in range(rows))
+    return '<html><body><div id="auction"><table><tbody>%s</tbody></table></div></body></html>' % trs
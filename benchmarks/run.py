@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""offline benchmark suite for parsers and decision functions
+
+every case runs on realistic (x1) and x10 inputs, result digest and timing are compared with
+benchmarks/baselines.json: changed digest or slowdown over tolerance is reported as regression
+
+usage: python -m benchmarks.run [--update] [--tolerance 1.5] [--only name ...]
+"""
+
+import argparse
+import calendar
+import hashlib
+import json
+import os
+import sys
+import timeit
+
+from auction import plan_bids
+from benchmarks import fixtures
+from manage import apply_players_filter, check_already_attacked_farm, check_full_carry_farm, \
+    check_green_losses_farm, check_orange_losses_farm, check_recently_attacked_farm, check_red_losses_farm, \
+    classify_farm, extract_farm_report_state, extract_oases_enemy_strength_from_source, extract_players_from_source
+from map_parser import parse_map_tiles
+from page_parsers import parse_auction_rows, parse_farm_lists, parse_reports_overview
+from raids import prioritize_raids
+from reports import parse_report_page
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+SCALES = (1, 10)
+# server time of fixtures: report times like "today, HH:MM" are resolved against it
+NOW = calendar.timegm((2020, 6, 15, 12, 0, 0))
+
+FILTER_CONF = {'ignore_npc': False, 'only_npc': False, 'inh': {'min': 16, 'max': 600}}
+AUCTION_BIDS = {'Ointment': 12, 'Cage': 12, 'Bandage': 11, 'Small Bandage': 11, 'Scroll': 11}
+
+
+def _map_side(scale):
+    # one zoom-3 window is 31x31 tiles, x10 tiles is ~98x98
+    return int(round(31 * scale ** 0.5))
+
+
+def _players(scale):
+    players = extract_players_from_source(fixtures.map_response(_map_side(scale)))
+    exist = set('_'.join([p['v_name'], str(p['x']), str(p['y'])]) for p in players[::3])
+    return players, exist
+
+
+def _raid_inputs(scale):
+    slots = [s for farm_list in parse_farm_lists(fixtures.farm_list_page(2, 100 * scale)) for s in farm_list['slots']]
+    summary = {(s['x'], s['y']): {'raids': 3, 'avg_bounty': 100 + i % 700, 'full_ratio': (i % 3) / 2.,
+                                  'losses_ratio': (i % 5) / 20., 'last_at': NOW} for i, s in enumerate(slots[::2])}
+    return slots, summary
+
+
+def _check_rows(rows):
+    return [(check_already_attacked_farm(r), check_green_losses_farm(r), check_orange_losses_farm(r),
+             check_red_losses_farm(r), check_full_carry_farm(r), check_recently_attacked_farm(r, NOW)) for r in rows]
+
+
+def _classify_rows(rows):
+    return [classify_farm(extract_farm_report_state(r, NOW), False, NOW) for r in rows]
+
+
+# name -> (setup(scale) -> args, func(*args))
+CASES = {
+    'extract_players_from_source': (
+        lambda scale: (fixtures.map_response(_map_side(scale)),),
+        extract_players_from_source),
+    'parse_map_tiles': (
+        lambda scale: (fixtures.map_response(_map_side(scale)),),
+        lambda source: list(parse_map_tiles(source))),
+    'apply_players_filter': (
+        lambda scale: _players(scale),
+        lambda players, exist: apply_players_filter(players, FILTER_CONF, exist)),
+    'extract_oases_enemy_strength_from_source': (
+        lambda scale: ([fixtures.tile_details_response(seed) for seed in range(10 * scale)],),
+        lambda sources: [extract_oases_enemy_strength_from_source(s) for s in sources]),
+    'check_farm': (
+        lambda scale: (fixtures.farm_slot_rows(100 * scale),),
+        _check_rows),
+    'classify_farm': (
+        lambda scale: (fixtures.farm_slot_rows(100 * scale),),
+        _classify_rows),
+    'parse_farm_lists': (
+        lambda scale: (fixtures.farm_list_page(2, 100 * scale),),
+        lambda source: parse_farm_lists(source, 'https://ts1.travian.com/build.php?tt=99&id=39')),
+    'parse_report_page': (
+        lambda scale: ([fixtures.report_page(seed) for seed in range(5 * scale)],),
+        lambda sources: [parse_report_page(s, NOW) for s in sources]),
+    'parse_reports_overview': (
+        lambda scale: (fixtures.reports_overview_page(20 * scale),),
+        lambda source: parse_reports_overview(source, 'https://ts1.travian.com/berichte.php')),
+    'parse_auction_rows': (
+        lambda scale: (fixtures.auction_page(20 * scale),),
+        lambda source: parse_auction_rows(source, 'https://ts1.travian.com/hero.php?t=4')),
+    'prioritize_raids': (
+        _raid_inputs,
+        lambda slots, summary: [s['id'] for s in prioritize_raids(slots, summary, {})]),
+    'plan_bids': (
+        lambda scale: (parse_auction_rows(fixtures.auction_page(20 * scale)), 5000 * scale),
+        lambda rows, silver: plan_bids(rows, AUCTION_BIDS, silver)),
+}
+
+
+def digest(result):
+    return hashlib.sha1(json.dumps(result, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def measure(func, args, min_time=0.2):
+    number = 1
+    while True:
+        elapsed = timeit.timeit(lambda: func(*args), number=number)
+        if elapsed >= min_time:
+            break
+        number *= 2
+    return min(timeit.repeat(lambda: func(*args), number=number, repeat=5)) / number
+
+
+def load_baselines():
+    if not os.path.exists(BASELINES_PATH):
+        return {}
+    with open(BASELINES_PATH) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--update', action='store_true', help='store current results as baselines')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='allowed slowdown ratio against baseline')
+    parser.add_argument('--only', nargs='*', help='case names to run')
+    options = parser.parse_args()
+
+    baselines = load_baselines()
+    regressions = []
+    for name, (setup, func) in CASES.items():
+        if options.only and name not in options.only:
+            continue
+        for scale in SCALES:
+            key = 'x%d' % scale
+            args = setup(scale)
+            result_digest = digest(func(*args))
+            seconds = measure(func, args)
+
+            baseline = baselines.get(name, {}).get(key)
+            status = 'new'
+            if baseline:
+                ratio = seconds / baseline['seconds']
+                status = 'x%.2f of baseline' % ratio
+                if baseline['digest'] != result_digest:
+                    status += ', RESULT CHANGED'
+                    regressions.append('%s %s: result changed' % (name, key))
+                if ratio > options.tolerance:
+                    status += ', SLOWER'
+                    regressions.append('%s %s: x%.2f slower' % (name, key, ratio))
+            print('%-42s %-4s %10.3f ms  %s' % (name, key, seconds * 1000, status))
+
+            if options.update:
+                baselines.setdefault(name, {})[key] = {'digest': result_digest, 'seconds': seconds}
+
+    if options.update:
+        with open(BASELINES_PATH, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print('baselines saved to %s' % BASELINES_PATH)
+        return 0
+
+    for r in regressions:
+        print('regression: %s' % r)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
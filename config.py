@@ -3,13 +3,72 @@
 import os
 
 CHROME_DRIVER_PATH = os.path.sep.join([os.path.abspath(os.path.dirname(__file__)), 'chromedriver'])
+STATE_DIR = os.path.sep.join([os.path.abspath(os.path.dirname(__file__)), 'state'])
+DRIVER_HEADLESS = False
+DRIVER_PAGE_LOAD_STRATEGY = 'eager'  # normal / eager / none
+DRIVER_BLOCK_RESOURCES = True  # images, fonts, media and analytics
+DRIVER_BLOCKED_URLS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.mp3', '*.ogg', '*.mp4', '*.webm',
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*facebook.net*',
+]
+DRIVER_PROFILE_DIR = None  # None: STATE_DIR/chrome-profile at driver start (per account), '' disables profile
+DRIVER_WINDOW_SIZE = '1280,1024'
+DRIVER_EXTRA_ARGUMENTS = []
 FIND_TIMEOUT = 10
 REQUEST_TIMEOUT = 35
-CUSTOM_WAIT_TIMEOUT = 10
-LOOP_TIMEOUT = 15 * 60  # fact loop timeout maybe from LOOP_TIMEOUT to LOOP_TIMEOUT*2 (random use)
+CUSTOM_WAIT_TIMEOUT = 10  # max wait for page readiness conditions
+WAIT_POLL_INTERVAL = 0.2
+AJAX_POOL_SIZE = 4
+LOOP_TIMEOUT = 15 * 60  # base task interval
+TASK_INTERVAL_JITTER = 1.  # fact interval maybe from interval to interval*(1+jitter) (random use)
+
+MAP_RADIUS = 200  # map coords from -MAP_RADIUS to MAP_RADIUS (401x401), wrapped on edges
+
+# travel times: 1x speeds (fields per hour) by tribe 1 romans, 2 teutons, 3 gauls
+TRIBE = 1
+SERVER_SPEED = 1
+UNIT_SPEEDS = {
+    1: [6, 5, 7, 16, 14, 10, 4, 3, 4, 5],
+    2: [7, 7, 6, 9, 10, 9, 4, 3, 4, 5],
+    3: [7, 6, 17, 19, 16, 13, 4, 3, 5, 5],
+}
+HERO_SPEED = 7
+HERO_BOOTS_BONUS = 0.  # e.g. 0.25 for boots of the mercenary, beyond tournament square distance, hero armies only
+TOURNAMENT_SQUARE_LEVELS = {}  # village name -> level
+TOURNAMENT_SQUARE_BONUS_PER_LEVEL = 0.2
+TOURNAMENT_SQUARE_DISTANCE = 20
+MAP_ZOOM_LEVEL = 3
+MAP_WINDOW_RADIUS = 15  # zoom 3 response covers 31x31 tiles around center
+MAP_GRID_MAX_AGE = 3 * 24 * 60 * 60  # ignore tiles not seen on map for longer
+MAP_CACHE_TTL = {
+    'players': 6 * 60 * 60,
+    'oases': 30 * 60,
+}
 
 CREDS = ('login', 'pass')
 HOST = 'http://ts1.travian.com'
+SESSION_MAX_AGE = 24 * 60 * 60  # reuse saved cookies and ajax token across restarts
+
+# per-task cost metrics, files go to STATE_DIR
+METRICS_ENABLED = True
+METRICS_ACCOUNT = ''  # account label, supervisor sets profile name
+METRICS_PROMETHEUS_FILE = 'metrics.prom'
+METRICS_JSONL_FILE = 'metrics.jsonl'
+
+# debug: record every webdriver command with calling manage.py line, ranked report goes to STATE_DIR
+PROFILE_WEBDRIVER = False
+PROFILE_WEBDRIVER_FILE = 'webdriver_profile.txt'
+PROFILE_WEBDRIVER_TOP = 30
+
+# multi-account mode (supervisor.py): each profile runs in own process with own state dir
+# {'name': 'main', 'creds': ('login', 'pass'), 'host': HOST, 'config': {'AUTO_FARM_LISTS': [...]}}
+ACCOUNTS = []
+SUPERVISOR_MAX_WORKERS = None  # supervisor refuses to start more accounts than worker slots
+SUPERVISOR_WORKER_MEMORY_MB = 700  # chrome + python per account
+SUPERVISOR_RESTART_DELAY = 5 * 60
+SUPERVISOR_REPORT_INTERVAL = 15 * 60
 
 HERO_HP_THRESHOLD_FOR_ADVENTURE = 60
 
@@ -20,6 +79,15 @@ HERO_TERROR_MIN_ENEMIES_STRENGTH = 4000
 HERO_TERROR_MAX_ENEMIES_STRENGTH = 12000
 HERO_TERROR_ESCORT_UNIT = 't2'
 HERO_TERROR_ESCORT_COUNT = 300
+HERO_TERROR_PARALLELISM = 4  # concurrent tile detail requests (keep <= AJAX_POOL_SIZE)
+HERO_TERROR_ESCORT_ATTACK = None  # attack of one escort unit: caps strength window by escort size
+HERO_TERROR_HERO_ATTACK = 0
+HERO_TERROR_RECHECK_TOP = 3  # stale leaders of ranking rechecked before choice
+HERO_TERROR_RECHECK_ROUNDS = 3
+# measured oasis animals are estimated to regrow until fresh check
+OASIS_STRENGTH_TTL = 60 * 60
+OASIS_REGEN_STRENGTH_PER_HOUR = 400
+OASIS_MAX_STRENGTH = 40000
 NATURE_ENEMIES_STRENGTH = {
     'Rat': 45,
     'Spider': 75,
@@ -37,6 +105,16 @@ SEND_FARMS_CANNON_FODDER_UNIT = 't2'
 SEND_FARMS_CANNON_FODDER_COUNT = 50
 SEND_FARMS_CANNON_FODDER_VILLAGE = 'village name'
 SEND_FARMS_MIN_INTERVAL = 60 * 60 * 1  # 1 hour
+FARM_STATE_TTL = 60 * 60 * 3  # revisit village page if stored last report state is older
+# raid slots ordered by expected bounty per round trip hour
+RAID_HISTORY_WINDOW = 3 * 24 * 60 * 60  # reports used for expected bounty
+RAID_DEFAULT_BOUNTY = 500  # target without reports
+RAID_CARRY_FULL_FACTOR = 1.5  # carry full means more resources were left
+RAID_DEFAULT_DISTANCE = 10
+RAID_SPEED = 10  # fields per hour for slots without troops info
+# start raid sends ticked slots in list order: best ranked slots go in separate earlier sends of this size,
+# so they get troops first when home troops are unknown (one farm list reload per send)
+RAID_SEND_BATCH_SIZE = 10
 
 FARM_LIST_SEND_BUTTON_PATTERN = 'start raid'
 FARM_LIST_ADD_BUTTON_PATTERN = 'add'
@@ -49,6 +127,9 @@ FARM_LIST_TAB_PATTERN = 'Farm List'
 FARM_LIST_ALREADY_ATTACK_PATTERN = 'Own attacking troops'
 FARM_LIST_CARRY_FULL_PATTERN = 'carry full'
 FARM_LIST_SEND_RESULT_PATTERN = 'raids have been made'
+# add farm list slots by posting dialog form from one in-page script, dialog per slot otherwise
+FARM_LIST_BULK_ADD = True
+FARM_LIST_BULK_TIMEOUT = 120
 BARRACKS_BUILDING_PATTERN = 'Barracks'
 STABLE_BUILDING_PATTERN = 'Stable'
 SEND_ARMY_TAB_PATTERN = 'Send troops'
@@ -60,6 +141,9 @@ REPORTS_TIME_PATTERN = r'today, (\d{2}):(\d{2})'
 REPORTS_TROOPS_PATTERN = 'Troops'
 REPORTS_CASUALTIES_PATTERN = 'Casualties'
 REPORTS_PRISONERS_PATTERN = 'Prisoners'
+REPORTS_BOUNTY_PATTERN = 'Bounty'
+REPORTS_DATETIME_PATTERN = r'(\d{2})\.(\d{2})\.(\d{2}),?\s+(\d{2}):(\d{2})(?::(\d{2}))?'
+REPORTS_INGEST_MAX_PAGES = 10
 
 
 AUTO_FARM_LISTS = ['farm list fullname']
@@ -67,6 +151,7 @@ AUTO_FARM_LISTS = ['farm list fullname']
 AUTO_UPDATE_FARM_LISTS = [{
     'center_x': 10,
     'center_y': 20,
+    'radius': 15,
     'list_name': 'farm_list_fullname_example',
     'ignore_npc': False,
     'only_npc': True,
@@ -75,6 +160,21 @@ AUTO_UPDATE_FARM_LISTS = [{
     'troop_count': 10
 },]
 
+# village registry (newdid, coords, building slots) refresh period
+VILLAGE_REGISTRY_MAX_AGE = 24 * 60 * 60
+BUILDING_GIDS = {'rally_point': 16, 'barracks': 19, 'stable': 20, 'workshop': 21}
+# buildings checked for unit train input, found building is remembered per village and unit
+TRAIN_BUILDING_GIDS = [BUILDING_GIDS['barracks'], BUILDING_GIDS['stable'], BUILDING_GIDS['workshop']]
+
+# troops overview tabs parsed once per build loop: 'total' is required,
+# 'home' (in village) and 'training' are used when server has these tabs; raids are capped by 'home'
+# troops, or by 'total' (upper bound, includes troops away) without it
+TROOPS_OVERVIEW_TABS = {
+    'total': '/dorf3.php?s=5',
+    # 'home': '/dorf3.php?s=5&su=2',
+    # 'training': '/dorf3.php?s=5&su=3',
+}
+
 AUTO_TROOP_BUILD = {
     'village_name': [
         {'troop_id': 't4', 'troop_queue_max': 20, 'troop_max': 600},
@@ -95,9 +195,25 @@ AUCTION_BIDS = {
     'Scroll': 11,
 }
 
-SEND_FARMS_FACTOR = 1
-UPDATE_FARM_LIST_FACTOR = 10
-CLEAR_FARM_LIST_FACTOR = 45
+# interval, delay (before first run): multiples of LOOP_TIMEOUT, applied at run so local overrides count;
+# priority: lower value runs first among due tasks; deadline: max seconds between due time and start
+TASK_SCHEDULE = {
+    'notify_about_attack': {'interval': 1 / 3., 'priority': 0, 'deadline': 60},
+    'analyze': {'interval': 1, 'priority': 1},
+    'send_army_to_farm': {'interval': 1, 'priority': 2, 'deadline': 15 * 60},
+    'send_hero_to_nature': {'interval': 1, 'priority': 3},
+    'send_hero_to_adventures': {'interval': 1, 'priority': 4},
+    'build_troops': {'interval': 1, 'priority': 5},
+    'clear_farm_lists': {'interval': 45, 'priority': 6, 'delay': 45},
+    'update_farm_lists': {'interval': 10, 'priority': 7, 'delay': 10},
+    'trading': {'interval': 1, 'priority': 8},
+    'ingest_reports': {'interval': 1, 'priority': 9},
+    'remove_uninteresting_reports': {'interval': 1, 'priority': 10},
+    'quest_complete': {'interval': 1, 'priority': 11},
+}
+# replaced by TASK_SCHEDULE, still set in config_local means stale local config
+OBSOLETE_SETTINGS = ['SEND_FARMS_FACTOR', 'UPDATE_FARM_LIST_FACTOR', 'CLEAR_FARM_LIST_FACTOR']
+URGENT_TASK_PRIORITY = 0  # tasks with priority <= value preempt long tasks between their steps
 
 ENABLE_HERO_TERROR = True
 ENABLE_TRADE = True
@@ -109,6 +225,7 @@ ENABLE_ADVENTURES = True
 ENABLE_QUEST_COMPLETE = True
 ENABLE_ATTACK_NOTIFY = True
 ENABLE_REMOVE_FARM_REPORTS = True
+ENABLE_INGEST_REPORTS = True
 ENABLE_BUILD_TROOPS = True
 
 DEBUG = False
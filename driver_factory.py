@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+
+from selenium import webdriver
+from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
+
+import config
+
+# chrome content settings: 2 = block
+BLOCK_PREFS = {
+    'profile.managed_default_content_settings.images': 2,
+    'profile.default_content_setting_values.notifications': 2,
+    'profile.default_content_setting_values.media_stream': 2,
+    'profile.default_content_setting_values.plugins': 2,
+}
+
+
+def create_driver(headless=None, page_load_strategy=None, block_resources=None, profile_dir=None):
+    """chrome driver configured from DRIVER_* settings (arguments override config)"""
+    headless = config.DRIVER_HEADLESS if headless is None else headless
+    page_load_strategy = page_load_strategy or config.DRIVER_PAGE_LOAD_STRATEGY
+    block_resources = config.DRIVER_BLOCK_RESOURCES if block_resources is None else block_resources
+    profile_dir = config.DRIVER_PROFILE_DIR if profile_dir is None else profile_dir
+    if profile_dir is None:
+        # resolved late: supervisor and config_local may change STATE_DIR after config import
+        profile_dir = os.path.sep.join([config.STATE_DIR, 'chrome-profile'])
+
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument('--headless')
+        options.add_argument('--disable-gpu')
+        options.add_argument('--window-size=%s' % config.DRIVER_WINDOW_SIZE)
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+        options.add_argument('--user-data-dir=%s' % profile_dir)
+    if block_resources:
+        options.add_experimental_option('prefs', BLOCK_PREFS)
+    for argument in config.DRIVER_EXTRA_ARGUMENTS:
+        options.add_argument(argument)
+
+    capabilities = DesiredCapabilities.CHROME.copy()
+    capabilities['pageLoadStrategy'] = page_load_strategy
+
+    os.environ["webdriver.chrome.driver"] = config.CHROME_DRIVER_PATH
+    driver = webdriver.Chrome(executable_path=config.CHROME_DRIVER_PATH, options=options,
+                              desired_capabilities=capabilities)
+    driver.set_page_load_timeout(config.REQUEST_TIMEOUT)
+    driver.implicitly_wait(config.FIND_TIMEOUT)
+
+    if block_resources:
+        # fonts, media and analytics have no content setting - drop them on network level
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': config.DRIVER_BLOCKED_URLS})
+        except Exception as e:
+            logging.warning('resource blocking not available %s', e)
+
+    logging.info('driver created: headless %s, page load %s, block resources %s, profile %s',
+                 headless, page_load_strategy, block_resources, profile_dir)
+    return driver
+
+
+def process_tree_rss_mb(pid: int):
+    """resident memory of process and all its descendants (linux /proc)"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open('/proc/%s/stat' % entry) as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total_kb = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        stack.extend(children.get(current, []))
+        try:
+            with open('/proc/%d/status' % current) as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total_kb += int(line.split()[1])
+                        break
+        except OSError:
+            continue
+    return total_kb / 1024.
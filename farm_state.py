@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+from storage import open_db
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS farm_state (
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    report_class TEXT,
+    carry_full INTEGER NOT NULL DEFAULT 0,
+    report_at REAL,
+    checked_at REAL NOT NULL,
+    PRIMARY KEY (x, y)
+);
+"""
+
+REPORT_CLASSES = ('green', 'orange', 'red')
+
+
+class FarmStateStore(object):
+    """last raid report state per farm village, keyed by coords"""
+
+    def __init__(self, db_name='farm_state.sqlite'):
+        self.conn = open_db(db_name, SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, x: int, y: int, ttl: int):
+        """state dict or None if unknown or stale"""
+        row = self.conn.execute('SELECT report_class, carry_full, report_at, checked_at FROM farm_state '
+                                'WHERE x = ? AND y = ?', (x, y)).fetchone()
+        if not row or time.time() - row['checked_at'] > ttl:
+            return None
+        return {'report_class': row['report_class'], 'carry_full': bool(row['carry_full']),
+                'report_at': row['report_at']}
+
+    def put(self, x: int, y: int, state: dict):
+        self.conn.execute('INSERT OR REPLACE INTO farm_state (x, y, report_class, carry_full, report_at, checked_at) '
+                          'VALUES (?, ?, ?, ?, ?, ?)',
+                          (x, y, state['report_class'], int(state['carry_full']), state['report_at'], time.time()))
+        self.conn.commit()
+
+    def put_if_newer(self, x: int, y: int, state: dict):
+        """keep stored state if it describes a later report"""
+        row = self.conn.execute('SELECT report_at FROM farm_state WHERE x = ? AND y = ?', (x, y)).fetchone()
+        if row and row['report_at'] and state['report_at'] and row['report_at'] > state['report_at']:
+            return False
+        self.put(x, y, state)
+        return True
@@ -2,31 +2,88 @@
 # -*- coding: utf-8 -*-
 
 import logging
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import datetime
-from json import loads
 import os
 import random
 import re
+import time
 from shlex import quote
 
 import lxml.html as l
-from selenium import webdriver
 from selenium.common.exceptions import NoSuchElementException
 from selenium.webdriver.support.ui import Select
 
 import config
 import config_utils
-
-
-def custom_wait():
-    time.sleep(config.CUSTOM_WAIT_TIMEOUT)
+from ajax_client import AjaxClient
+from auction import plan_bids
+from driver_factory import create_driver
+from farm_state import FarmStateStore
+from map_cache import MapCache
+from map_grid import MapGrid
+from map_planner import area_tiles, plan_map_queries
+from map_parser import decode_source, parse_map_tiles
+from metrics import Metrics
+from oases import OasisIndex, rank_with_rechecks, troops_strength
+from page_parsers import find_farm_list, parse_auction_rows, parse_building_slots, parse_farm_lists, \
+    parse_incoming_attack_timers, parse_reports_overview, parse_sidebar_villages, parse_silver_amount, \
+    parse_troops_overview, parse_villages_overview
+from profiler import RoundTripProfiler
+from raids import prioritize_raids
+from reports import REPORT_CLASS_NAMES, ReportStore, parse_report_page, parse_report_time
+from scheduler import Scheduler
+from session import drop_session, load_session, save_session
+from travel import army_speed, distances, tournament_square_factor, travel_hours
+from troops import plan_troop_orders
+from villages import VillageRegistry, with_newdid
+from waits import XPATH_PRESENT_SCRIPT, Waiter
+
+
+# post add-slot dialog form for every (x, y) sequentially, callback gets per-slot success flags
+BULK_ADD_SLOTS_SCRIPT = """
+var slots = arguments[0], troopId = arguments[1], troopCount = arguments[2], done = arguments[arguments.length - 1];
+var dialog = document.getElementById('raidListSlot');
+var form = dialog && (dialog.tagName === 'FORM' ? dialog : dialog.querySelector('form'));
+if (!form) { done({error: 'add slot form not found'}); return; }
+var action = form.getAttribute('action') || window.location.href, added = [];
+function next(i) {
+    if (i >= slots.length) { done({added: added}); return; }
+    form.querySelector('#xCoordInput').value = slots[i][0];
+    form.querySelector('#yCoordInput').value = slots[i][1];
+    form.querySelector('#' + troopId).value = troopCount;
+    fetch(action, {method: 'POST', body: new URLSearchParams(new FormData(form)), credentials: 'same-origin'})
+        .then(function (r) { added.push(r.ok); next(i + 1); })
+        .catch(function () { added.push(false); next(i + 1); });
+}
+next(0);
+"""
+
+CLICK_ELEMENTS_SCRIPT = ("arguments[0].forEach(function (xpath) {"
+                         " document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null)"
+                         ".singleNodeValue.click(); });")
+
+
+AJAX_TOKEN_RE = re.compile(r'ajaxToken[\'"]?\s*[=:]\s*[\'"]([0-9a-f]{32})[\'"]')
 
 
 def send_desktop_notify(message):
     os.system('notify-send "%s" "%s"' % ('travian-bot event', quote(message).replace('`', '\`')))
 
 
+def parse_ajax_token(source):
+    res = AJAX_TOKEN_RE.search(source)
+    if res:
+        return res.group(1)
+
+    token_lines = [i for i in source.split("\n") if 'ajaxToken' in i]
+    if not token_lines:
+        return ''
+    token_line = token_lines[0].strip()
+    logging.debug(token_line)
+    return token_line[-34:-2]
+
+
 def unique_village_mask(name, x, y):
     return '_'.join([name.strip(), str(x), str(y)])
 
@@ -56,57 +113,30 @@ def apply_players_filter(players, conf, exist_villages):
 
 
 def extract_players_from_source(source):
-    map_dict = loads(source)
-    players = [i for i in map_dict['response']['data']['tiles'] if 'u' in i]
-    result = []
-    for p in players:
-        try:
-            inh = int(re.findall(r'\{k\.einwohner\}\s*(\d+)<br\s+/>', p['t'])[0])
-        except IndexError:
-            # pass players oasis
-            continue
-        ally = re.findall(r'\{k\.allianz\}\s*(.+)<br\s+/>\{k\.volk\}', p['t'])[0].strip()
-        race_num = int(re.findall(r'\{k\.volk\}\s*\{a\.v(\d{1})\}', p['t'])[0].strip())
-        name = re.findall(r'\{k\.spieler\}\s*(.+)<br\s+/>\{k\.einwohner\}', p['t'])[0].strip()
-        village_name = re.findall(r'\{k\.dt\}\s*(.*)', p['c'])[0].strip()
-        result.append({
-            'x': int(p['x']),
-            'y': int(p['y']),
-            'id': int(p['u']),
-            'ally': ally,
-            'name': name,
-            'race': race_num,
-            'inh': inh,
-            'v_name': village_name
-        })
-    return result
+    return parse_map_tiles(source).players
 
 
 def extract_free_oases_from_source(source):
-    map_dict = loads(source)
-    oases = [(int(i['x']), int(i['y'])) for i in map_dict['response']['data']['tiles']
-             if 'd' in i and 't' in i and 'u' not in i and i['d'] == -1 and ('25%' in i['t'] or '50%' in i['t'])]
-    return oases
+    return parse_map_tiles(source).free_oases
 
 
-def extract_oases_enemy_strength_from_source(source):
-    map_dict = loads(source)
+def extract_oases_enemy_troops_from_source(source):
+    """tile details -> {animal name: count}"""
+    map_dict = decode_source(source)
     document = l.fromstring(map_dict['response']['data']['html'].strip())
-    out = 0
+    out = {}
     for tr in document.xpath('//table[@id="troop_info"]//td[@class="val"]/parent::tr'):
         count = int(tr.xpath('.//td[@class="val"]/text()')[0].strip())
         name = tr.xpath('.//td[@class="desc"]/text()')[0].strip()
         logging.info('oases analize %s %d', name, count)
-        try:
-            index = [i for i in config.NATURE_ENEMIES_STRENGTH if i in name][0]
-            strength = count * config.NATURE_ENEMIES_STRENGTH[index]
-            out += strength
-        except IndexError:
-            logging.warning('undefined nature troop %s', name)
-
+        out[name] = out.get(name, 0) + count
     return out
 
 
+def extract_oases_enemy_strength_from_source(source):
+    return troops_strength(extract_oases_enemy_troops_from_source(source))
+
+
 def check_already_attacked_farm(source):
     return config.FARM_LIST_ALREADY_ATTACK_PATTERN in source
 
@@ -115,19 +145,27 @@ def check_green_losses_farm(source):
     return config.FARM_LIST_ATTACK_PATTERN1 in source
 
 
-def check_recently_attacked_farm(source, current_timestamp):
+def extract_report_timestamp(source, current_timestamp):
+    """server timestamp of "today, HH:MM" report time or None"""
     if not current_timestamp:
-        return False
+        return None
 
     res = re.findall(config.REPORTS_TIME_PATTERN, source, re.MULTILINE)
     if not res:
-        return False
+        return None
 
     hour, minute = res[0]
     server_time = datetime.datetime.utcfromtimestamp(current_timestamp)
     attack_time = server_time.replace(hour=int(hour), minute=int(minute))
     delta = server_time - attack_time
-    return int(delta.total_seconds()) <= config.SEND_FARMS_MIN_INTERVAL
+    return current_timestamp - int(delta.total_seconds())
+
+
+def check_recently_attacked_farm(source, current_timestamp):
+    report_at = extract_report_timestamp(source, current_timestamp)
+    if report_at is None:
+        return False
+    return current_timestamp - report_at <= config.SEND_FARMS_MIN_INTERVAL
 
 
 def check_orange_losses_farm(source):
@@ -142,137 +180,227 @@ def check_red_losses_farm(source):
     return config.FARM_LIST_ATTACK_PATTERN3 in source
 
 
+def extract_farm_report_state(source, current_timestamp):
+    """last raid report state from farm list row or village page markup"""
+    report_class = None
+    if check_green_losses_farm(source):
+        report_class = 'green'
+    elif check_orange_losses_farm(source):
+        report_class = 'orange'
+    elif check_red_losses_farm(source):
+        report_class = 'red'
+    return {
+        'report_class': report_class,
+        'carry_full': check_full_carry_farm(source),
+        'report_at': extract_report_timestamp(source, current_timestamp),
+    }
+
+
+def classify_farm(state, is_red, current_timestamp):
+    """green_full, green_other, orange_full, orange_other or None for skip"""
+    report_class = state['report_class'] if state else None
+    if not report_class:
+        return None if is_red else 'green_other'
+
+    report_at = state['report_at']
+    is_recently_attacked = bool(current_timestamp and report_at is not None and
+                                current_timestamp - report_at <= config.SEND_FARMS_MIN_INTERVAL)
+    is_today = bool(current_timestamp and report_at is not None and
+                    datetime.datetime.utcfromtimestamp(report_at).date() ==
+                    datetime.datetime.utcfromtimestamp(current_timestamp).date())
+
+    if report_class == 'green' and state['carry_full']:
+        return 'green_full'
+    if report_class == 'orange' and state['carry_full']:
+        return 'orange_full'
+    if report_class == 'green' and not is_recently_attacked:
+        return 'green_other'
+    if report_class == 'orange' and not is_today:
+        return 'orange_other'
+    return None
+
+
 class Manager(object):
 
     MAIN_PAGE = config.HOST + '/dorf1.php'
     VILLAGE_PAGE = config.HOST + '/dorf2.php'
-    TROOPS_OVERVIEW_PAGE = config.HOST + '/dorf3.php?s=5'
+    VILLAGES_OVERVIEW_PAGE = config.HOST + '/dorf3.php'
     HERO_PAGE = config.HOST + '/hero.php'
     REPORTS_PAGE = config.HOST + '/berichte.php'
+    REPORTS_LIST_PAGE = config.HOST + '/berichte.php?page=%d'
     HERO_ADVENTURE_PAGE = config.HOST + '/hero.php?t=3'
     AUCTION_PAGE = config.HOST + '/hero.php?t=4&action=buy'
-    MAP_PAGE = config.HOST + '/karte.php'
-    MAP_DATA_PAGE = config.HOST + '/ajax.php?cmd=mapPositionData'
-    TILE_DATA_PAGE = config.HOST + '/ajax.php?cmd=viewTileDetails'
     FARM_LIST_PAGE = None
     SEND_ARMY_PAGE = None
 
-    loop_number = 0
+    scheduler = None
     is_logged = False
     hero_hp = 0
-    current_timestamp = 0
+    server_time_offset = None
     ajax_token = ''
+    ajax = None
 
-    def __init__(self, user, passwd):
-        os.environ["webdriver.chrome.driver"] = config.CHROME_DRIVER_PATH
-        self.driver = webdriver.Chrome(executable_path=config.CHROME_DRIVER_PATH)
-        self.driver.set_page_load_timeout(config.REQUEST_TIMEOUT)
-        self.driver.implicitly_wait(config.FIND_TIMEOUT)
-
-        self._login(user, passwd)
-        if not self.is_logged:
-            raise RuntimeError('login error')
+    def __init__(self, user, passwd, driver_options=None):
+        self.driver = create_driver(**(driver_options or {}))
+        try:
+            self.wait = Waiter(self.driver)
+            self.metrics = Metrics(config.METRICS_ACCOUNT) if config.METRICS_ENABLED else None
+            if self.metrics:
+                self.metrics.instrument_driver(self.driver)
+                self.metrics.instrument_waiter(self.wait)
+            self.profiler = RoundTripProfiler(__file__) if config.PROFILE_WEBDRIVER else None
+            if self.profiler:
+                self.profiler.attach(self.driver)
+            self.map_cache = MapCache(config.MAP_CACHE_TTL)
+            self.map_grid = MapGrid()
+            self.farm_state = FarmStateStore()
+            self.reports = ReportStore()
+            self.villages = VillageRegistry()
+            # names not found even after forced registry refresh, forgotten on next max age refresh
+            self.missing_villages = set()
+            self.oases = OasisIndex()
+
+            if not self._restore_session():
+                self._login(user, passwd)
+            if not self.is_logged:
+                raise RuntimeError('login error')
+        except BaseException:
+            # failed login must not leave chrome holding the profile dir for next restart
+            self.driver.quit()
+            raise
 
     def close(self):
+        if self.is_logged:
+            self._save_session()
+        if self.profiler:
+            logging.info(self._dump_profile())
+        self.map_cache.close()
+        self.map_grid.close()
+        self.farm_state.close()
+        self.reports.close()
+        self.oases.close()
+        if self.ajax:
+            self.ajax.close()
         if self.driver:
             self.driver.quit()
 
-    def run(self):
-        while True:
-            logging.info("\n")
-            self.loop_number += 1
-            self._sanitizing()
-
+    def run(self, on_task_done=None):
+        tasks = {
+            # проверяем вражеские налёты
+            'notify_about_attack': (config.ENABLE_ATTACK_NOTIFY, self._notify_about_attack),
             # анализируем деревню
-            self._analyze()
-
+            'analyze': (True, self._refresh_state),
             # строим войска
-            if config.ENABLE_BUILD_TROOPS:
-                logging.info("\n")
-                try:
-                    self._build_troops()
-                except Exception as e:
-                    logging.error('troop building process exception %s', e)
-
+            'build_troops': (config.ENABLE_BUILD_TROOPS, self._build_troops),
+            # складываем репорты в локальную базу
+            'ingest_reports': (config.ENABLE_INGEST_REPORTS, self._ingest_reports),
             # remove uninteresting reports
-            if config.ENABLE_REMOVE_FARM_REPORTS:
-                logging.info("\n")
-                try:
-                    self._remove_uninteresting_reports()
-                except Exception as e:
-                    logging.error('reports remove process exception %s', e)
-
-            # проверяем вражеские налёты
-            if config.ENABLE_ATTACK_NOTIFY:
-                logging.info("\n")
-                try:
-                    self._notify_about_attack()
-                except Exception as e:
-                    logging.error('notify about attack exception %s', e)
-
+            'remove_uninteresting_reports': (config.ENABLE_REMOVE_FARM_REPORTS, self._remove_uninteresting_reports),
             # отправляем героя в приключения
-            if config.ENABLE_ADVENTURES:
-                logging.info("\n")
-                try:
-                    self._send_hero_to_adventures()
-                except Exception as e:
-                    logging.error('adventures process exception %s', e)
-
+            'send_hero_to_adventures': (config.ENABLE_ADVENTURES, self._send_hero_to_adventures),
             # отправляем героя на прокачку в джунгли
-            if config.ENABLE_HERO_TERROR:
-                logging.info("\n")
-                try:
-                    self._send_hero_to_nature()
-                except Exception as e:
-                    logging.error('hero terror process exception %s', e)
-
+            'send_hero_to_nature': (config.ENABLE_HERO_TERROR, self._send_hero_to_nature),
             # забираем награды за квесты
-            if config.ENABLE_QUEST_COMPLETE:
-                logging.info("\n")
-                try:
-                    self._quest_complete()
-                except Exception as e:
-                    logging.error('quests process exception %s', e)
-
+            'quest_complete': (config.ENABLE_QUEST_COMPLETE, self._quest_complete),
             # торгуем (пока только покупаем)
-            if config.ENABLE_TRADE:
-                logging.info("\n")
-                try:
-                    self._trading()
-                except Exception as e:
-                    logging.error('trade process exception %s', e)
-
+            'trading': (config.ENABLE_TRADE, self._trading),
             # шлём пылесосы по фарм листам
-            if config.ENABLE_SEND_FARMS and (not float(self.loop_number) % config.SEND_FARMS_FACTOR or self.loop_number == 1):
-                logging.info("\n")
-                try:
-                    self._send_army_to_farm()
-                except Exception as e:
-                    logging.error('farm send process exception %s', e)
-
+            'send_army_to_farm': (config.ENABLE_SEND_FARMS, self._send_army_to_farm),
+            # чистим фарм листы
+            'clear_farm_lists': (config.ENABLE_CLEAR_FARMS and config.ENABLE_UPDATE_FARMS, self._clear_farm_lists),
             # обновляем фарм листы
-            if config.ENABLE_CLEAR_FARMS and config.ENABLE_UPDATE_FARMS \
-                    and not float(self.loop_number) % config.CLEAR_FARM_LIST_FACTOR:
-                logging.info("\n")
-                try:
-                    self._clear_farm_lists()
-                except Exception as e:
-                    logging.error('farm clear process exception %s', e)
+            'update_farm_lists': (config.ENABLE_UPDATE_FARMS, self._update_farm_lists),
+        }
 
-            # обновляем фарм листы
-            if config.ENABLE_UPDATE_FARMS and not float(self.loop_number) % config.UPDATE_FARM_LIST_FACTOR:
-                logging.info("\n")
-                try:
-                    self._update_farm_lists()
-                except Exception as e:
-                    logging.error('farm update process exception %s', e)
+        for name in config.OBSOLETE_SETTINGS:
+            if hasattr(config, name):
+                logging.warning('setting %s is obsolete and ignored, use TASK_SCHEDULE', name)
+
+        self.scheduler = scheduler = Scheduler(on_task_done=on_task_done)
+        for name, (enabled, func) in tasks.items():
+            if not enabled:
+                continue
+            schedule = config.TASK_SCHEDULE[name]
+            interval = schedule['interval'] * config.LOOP_TIMEOUT
+            delay = schedule.get('delay', 0) * config.LOOP_TIMEOUT
+            scheduler.add(name, self.__guard_task(name, func), interval, schedule['priority'],
+                          deadline=schedule.get('deadline'), delay=delay, jitter=config.TASK_INTERVAL_JITTER)
+            logging.info('schedule task %s every %d sec, delay %d sec, %s', name, interval, delay, schedule)
 
-            if not config.DEBUG:
+        scheduler.run_forever()
+
+    def __guard_task(self, name, func):
+        def _run():
+            logging.info("\n")
+            if self.metrics:
+                self.metrics.task_started(name)
+            ok = False
+            try:
+                func()
+                ok = True
+            except Exception:
+                # recover broken page state before next task
                 self._sanitizing()
+                raise
+            finally:
+                if self.metrics:
+                    self.metrics.task_finished(ok)
+                if self.profiler:
+                    self._dump_profile()
+                for label, (count, total, timeouts) in sorted(self.wait.pop_summary().items()):
+                    logging.info('waited %s %d times %.1f sec (%d timeouts)', label, count, total, timeouts)
+        return _run
+
+    def _dump_profile(self):
+        return self.profiler.dump(os.path.join(config.STATE_DIR, config.PROFILE_WEBDRIVER_FILE),
+                                  config.PROFILE_WEBDRIVER_TOP)
+
+    def _yield_to_urgent(self):
+        if self.scheduler:
+            self.scheduler.run_urgent(config.URGENT_TASK_PRIORITY)
+
+    def _refresh_state(self):
+        self._sanitizing()
+        self._refresh_villages()
+        self._analyze()
+
+    def _refresh_villages(self, force=False):
+        """rebuild village registry from sidebar and every village map (rare: registry max age or new village)"""
+        if not force and not self.villages.is_stale():
+            return
+        logging.info('refresh village registry')
+        if not force:
+            self.missing_villages.clear()
+        back_url = self.driver.current_url
+        self.driver.get(self.VILLAGE_PAGE)
+        records = parse_sidebar_villages(self.driver.page_source, self.driver.current_url)
+        if not records:
+            logging.warning('villages not found in sidebar')
+            return
 
-            sleep_time = config.LOOP_TIMEOUT + config.LOOP_TIMEOUT * random.random()
-            logging.info('sleep random time %f %d', sleep_time, self.loop_number)
-            time.sleep(sleep_time)
+        self.villages.update_villages(records)
+        for village in records:
+            if village['newdid']:
+                self.driver.get(with_newdid(self.VILLAGE_PAGE, village['newdid']))
+                self.villages.active = village['name']
+            buildings = parse_building_slots(self.driver.page_source)
+            self.villages.set_buildings(village['name'], buildings)
+            logging.info('village %s (%s|%s): %d buildings', village['name'], village['x'], village['y'],
+                         len(buildings))
+        self.villages.mark_updated()
+        if force:
+            self.driver.get(back_url)
+
+    def __village(self, name):
+        village = self.villages.get(name)
+        if not village and name not in self.missing_villages:
+            logging.info('village %s not in registry', name)
+            self._refresh_villages(force=True)
+            village = self.villages.get(name)
+            if not village:
+                logging.warning('village %s not found, no registry refresh for it until max age', name)
+                self.missing_villages.add(name)
+        return village
 
     def _sanitizing(self):
         self.__close_all_dialogs()
@@ -341,7 +469,7 @@ class Manager(object):
                 reward_elem = self.driver.find_element_by_xpath('//div[@id="achievementRewardList"]'
                                                                 '//div[contains(@class, "rewardReady")]')
                 reward_elem.click()
-                custom_wait()
+                self.wait.element('//button[contains(@class, "questButtonGainReward")]', 'quest reward button')
                 reward_button = self.driver.find_element_by_xpath('//button[contains(@class, "questButtonGainReward")]')
                 reward_button.click()
                 logging.info('daily quest complete')
@@ -363,17 +491,59 @@ class Manager(object):
         except:
             logging.info('login not success')
 
-        def _parse_ajax_token(source):
-            token_line = [i for i in source.split("\n") if 'ajaxToken' in i][0].strip()
-            logging.debug(token_line)
-            return token_line[-34:-2]
-
-        ajax_token = _parse_ajax_token(self.driver.page_source)
+        ajax_token = parse_ajax_token(self.driver.page_source)
         logging.info('get ajax token %s', ajax_token)
         if not ajax_token:
             raise RuntimeError('ajax token not found')
         self.ajax_token = ajax_token
-        
+        self._connect_ajax(ajax_token)
+        if self.is_logged:
+            self._save_session()
+
+    def _restore_session(self):
+        session = load_session(config.HOST)
+        if not session:
+            return False
+
+        logging.info('restore session call')
+        # cookies can be set only on page of same domain
+        self.driver.get(config.HOST)
+        self.driver.delete_all_cookies()
+        for cookie in session['cookies']:
+            try:
+                self.driver.add_cookie(cookie)
+            except Exception as e:
+                logging.warning('restore cookie %s error %s', cookie.get('name'), e)
+
+        self.driver.get(self.MAIN_PAGE)
+        # without implicit wait: expired session lands on login form
+        if not self.driver.execute_script("return document.getElementById('village_map') !== null;"):
+            logging.info('saved session expired')
+            drop_session()
+            return False
+
+        self.ajax_token = parse_ajax_token(self.driver.page_source) or session['ajax_token']
+        self._connect_ajax(self.ajax_token)
+        self.FARM_LIST_PAGE = session['pages'].get('farm_list') or self.FARM_LIST_PAGE
+        self.SEND_ARMY_PAGE = session['pages'].get('send_army') or self.SEND_ARMY_PAGE
+        self.is_logged = True
+        logging.info('session restored, ajax token %s', self.ajax_token)
+        return True
+
+    def _connect_ajax(self, ajax_token):
+        self.ajax = AjaxClient.from_driver(self.driver, config.HOST, ajax_token)
+        if self.metrics:
+            self.metrics.instrument_session(self.ajax.session)
+
+    def _save_session(self):
+        try:
+            save_session(config.HOST, self.driver.get_cookies(), self.ajax_token, {
+                'farm_list': self.FARM_LIST_PAGE,
+                'send_army': self.SEND_ARMY_PAGE,
+            })
+        except Exception as e:
+            logging.warning('save session error %s', e)
+
     def _analyze(self):
         logging.info('analyze call')
         self._analyze_hero()
@@ -392,46 +562,57 @@ class Manager(object):
             logging.warning('hero analyze error')
             self.hero_hp = 0
 
+    @property
+    def current_timestamp(self):
+        """server time: last read servertime advanced by local clock, so tasks scheduled apart from analyze
+        never compare with stale time; 0 if never read"""
+        if self.server_time_offset is None:
+            return 0
+        return int(time.time() + self.server_time_offset)
+
     def _analyze_time(self):
         try:
-            self.current_timestamp = int(self.driver.find_element_by_id('servertime')
-                                         .find_element_by_xpath('.//span[@class="timer"]').get_attribute('value'))
+            server_time = int(self.driver.find_element_by_id('servertime')
+                              .find_element_by_xpath('.//span[@class="timer"]').get_attribute('value'))
+            self.server_time_offset = server_time - time.time()
             logging.info('current time is %d', self.current_timestamp)
         except:
-            logging.warning('time analyze error')
-            self.current_timestamp = 0
+            logging.warning('time analyze error, keep last server time offset %s', self.server_time_offset)
 
     def _notify_about_attack(self):
         logging.info('notify about attack call')
-        self.driver.get(self.MAIN_PAGE)
-
-        links = self.driver.find_elements_by_xpath('//div[@id="sidebarBoxVillagelist"]//li//a/div[@class="name"]'
-                                                   '/parent::a')
-        village_links = [link.get_attribute('href') for link in links]
-        logging.info('found %d villages', len(village_links))
-
-        attack_timing = []
-        for link in village_links:
-            logging.info('check attack %s village', link)
-            self.driver.get(link)
-            try:
-                attack_timer_elem = self.driver.find_element_by_xpath('//div[@id="map_details"]'
-                                                                '//div[contains(@class, "villageList")]'
-                                                                '//img[@class="att1" or @class="att3"]'
-                                                                '/ancestor::tr//span[@class="timer"]')
-                logging.info('find attack timer %s', attack_timer_elem.text)
-                attack_timing.append(int(attack_timer_elem.get_attribute('value')))
-            except NoSuchElementException:
-                logging.info('not found enemy attacks')
-                continue
-
-        logging.info('found %d attack timings', len(attack_timing))
+        self.driver.get(self.VILLAGES_OVERVIEW_PAGE)
+        villages = parse_villages_overview(self.driver.page_source, self.driver.current_url)
+        if villages:
+            attacked = [v for v in villages if v['under_attack']]
+            logging.info('found %d villages, %d under attack', len(villages), len(attacked))
+        else:
+            logging.warning('villages overview not available - check every village')
+            # sidebar links are relative to dorf3 here, attack timers are only on dorf1
+            attacked = [dict(v, link=with_newdid(self.MAIN_PAGE, v['newdid']) if v['newdid'] else self.MAIN_PAGE)
+                        for v in parse_sidebar_villages(self.driver.page_source, self.driver.current_url)]
+
+        attack_timing = {}
+        if attacked:
+            # village links switch active village
+            self.villages.active = None
+        for village in attacked:
+            logging.info('check attack %s village', village['name'])
+            self.driver.get(village['link'])
+            timers = parse_incoming_attack_timers(self.driver.page_source)
+            if timers:
+                attack_timing[village['name']] = min(timers)
+
+        for name, timer in sorted(attack_timing.items(), key=lambda i: i[1]):
+            logging.info('village %s earliest attack in %d sec', name, timer)
+        logging.info('found %d attacked villages', len(attack_timing))
 
         if attack_timing:
-            send_desktop_notify('found %d attacks (%s)' % (len(attack_timing), min(attack_timing)))
-            if min(attack_timing) <= config.LOOP_TIMEOUT * 4.:
-                config_utils.send_attack_notify('t-manager: found %d attacks (min time %d)' %
-                                          (len(attack_timing), min(attack_timing)))
+            earliest = min(attack_timing.values())
+            send_desktop_notify('found attacks on %d villages (%s)' % (len(attack_timing), earliest))
+            if earliest <= config.LOOP_TIMEOUT * 4.:
+                config_utils.send_attack_notify('t-manager: found attacks on %d villages (min time %d)' %
+                                                (len(attack_timing), earliest))
 
     def _send_hero_to_adventures(self):
         logging.info('send hero to adventure call')
@@ -446,11 +627,11 @@ class Manager(object):
 
         if links:
             links[0].click()
+            self.wait.page_ready()
 
             try:
                 adventure_send_button = self.driver.find_element_by_xpath('//form[@class="adventureSendButton"]'
                                                                           '//button[contains(@class, "green")]')
-                custom_wait()
                 adventure_send_button.click()
                 logging.info('send to adventure success')
                 send_desktop_notify('send to adventure')
@@ -473,41 +654,35 @@ class Manager(object):
         village_name = status_elem.find_element_by_xpath('.//a').text.strip()
         logging.info('hero village %s', village_name)
 
-        # select village
-        village_link_elem = self.driver.find_element_by_xpath('//div[@id="sidebarBoxVillagelist"]//li//a'
-                                                              '/div[@class="name" and contains(text(), "%s")]'
-                                                              '/parent::a' % village_name)
-        village_x = village_link_elem.find_element_by_class_name('coordinateX').get_attribute('innerHTML')
-        village_x = int(re.findall(r'(-?\d+)', village_x)[0])
-
-        village_y = village_link_elem.find_element_by_class_name('coordinateY').get_attribute('innerHTML')
-        village_y = int(re.findall(r'(-?\d+)', village_y)[0])
-
-        logging.info('hero village link %s %s %s', village_link_elem.get_property('href'), village_x, village_y)
-        village_link_elem.click()
-        custom_wait()
+        village = self.__village(village_name)
+        if not village:
+            logging.warning('hero village not found')
+            return
+        village_x, village_y = village['x'], village['y']
+        logging.info('hero village %s %s %s', village['name'], village_x, village_y)
+        self.__select_village(village['name'])
 
         # get all free oases
-        source = self.__extract_map_data(village_x, village_y)
+        source = self.__extract_map_data(village_x, village_y, 'oases')
         oases = extract_free_oases_from_source(source)
-        logging.info('found %d free oases', len(oases))
-
-        # select oasis
-        random.shuffle(oases)
-        selected_coords = None
-        for i in oases:
-            logging.info('oases %s check', i)
-            tile_info_source = self.__get_tile_info(*i)
-            strength = extract_oases_enemy_strength_from_source(tile_info_source)
-            logging.info('enemy strength %d', strength)
-            if config.HERO_TERROR_MIN_ENEMIES_STRENGTH <= strength <= config.HERO_TERROR_MAX_ENEMIES_STRENGTH:
-                selected_coords = i
-                break
-
-        if not selected_coords:
+        logging.info('found %d free oases (map cache %s)', len(oases), self.map_cache.stats())
+
+        # never measured oases once, then only stale leaders of xp per travel hour ranking
+        self.__check_oases([coords for coords in oases if self.oases.get(*coords) is None])
+        escort = {config.HERO_TERROR_ESCORT_UNIT: config.HERO_TERROR_ESCORT_COUNT} if config.HERO_TERROR_ESCORT_COUNT else {}
+        speed = army_speed(dict(escort, t11=1))
+        factor = tournament_square_factor(village['name'], with_hero=True)
+        ranked = rank_with_rechecks(oases, self.oases, (village_x, village_y), speed, factor, self.__check_oases)
+
+        candidates = [r for r in ranked if r[3]]
+        logging.info('found %d suitable oases from %d', len(candidates), len(oases))
+        if not candidates:
             logging.warning('not found full oasis?')
             return
 
+        score, selected_coords, strength, _ = candidates[0]
+        logging.info('select oasis %s with enemy strength %d (%.0f per travel hour)', selected_coords, strength, score)
+
         # send hero to selected oasis
         res = self.__goto_sendarmy_tab()
         if not res:
@@ -528,75 +703,69 @@ class Manager(object):
 
         form_elem.find_element_by_xpath('.//div[@class="option"]//input[@value="4"]').click()
         form_elem.submit()
-        custom_wait()
+        self.wait.element('//*[contains(@class, "rallyPointConfirm")]', 'send army confirm')
 
         logging.info('confirm send')
-        self.driver.find_element_by_class_name('rallyPointConfirm').click()
-        custom_wait()
+        confirm_elem = self.driver.find_element_by_class_name('rallyPointConfirm')
+        confirm_elem.click()
+        self.wait.reloaded(confirm_elem, 'send army')
+        self.oases.mark_cleared(*selected_coords)
 
     def _build_troops(self):
         logging.info('troops build call')
 
-        for village, configs in config.AUTO_TROOP_BUILD.items():
-            for conf in configs:
-                logging.info('process %s %s', village, conf)
+        orders = plan_troop_orders(self.__troops_matrix(), config.AUTO_TROOP_BUILD)
+        logging.info('planned %d train orders', len(orders))
 
-                # check current count total
-                current_unit_total = self.__find_current_unit_count(conf['troop_id'], village)
-                logging.info('current unit count %d', current_unit_total)
-                if current_unit_total >= conf['troop_max']:
-                    logging.info('total already max')
-                    continue
-
-                need_train = conf['troop_max'] - current_unit_total
-
-                self.__select_village(village)
-                logging.info('select village %s', village)
+        for order in orders:
+            village, conf = order['village'], order['conf']
+            logging.info('process %s %s', village, conf)
+            need_train = conf['troop_max'] - order['total']
 
-                # found building for troop type
-                unit_input_elem = self.__find_troop_train_building(conf['troop_id'])
-                if not unit_input_elem:
-                    logging.warning('unit build not found')
-                    continue
+            # found building for troop type
+            unit_input_elem = self.__find_troop_train_building(village, conf['troop_id'])
+            if not unit_input_elem:
+                logging.warning('unit build not found')
+                continue
 
-                # check available for build
-                elem = unit_input_elem.find_element_by_xpath('./following-sibling::a')
-                available_unit_count = int(elem.text)
-                logging.info('found available unit count %d', available_unit_count)
-                if available_unit_count <= 0:
-                    logging.info('not found available units')
-                    continue
+            # check available for build
+            elem = unit_input_elem.find_element_by_xpath('./following-sibling::a')
+            available_unit_count = int(elem.text)
+            logging.info('found available unit count %d', available_unit_count)
+            if available_unit_count <= 0:
+                logging.info('not found available units')
+                continue
 
-                # check current queue
-                unit_name = str(unit_input_elem.find_element_by_xpath('./preceding-sibling::div[contains(@class, "tit")]/a[2]').text)
-                logging.info('unit name is %s', unit_name)
-                queue_elems = self.driver.find_elements_by_xpath('//table[@class="under_progress"]//td[@class="desc" and contains(string(), "%s")]' % unit_name)
-                logging.debug('found %d current queue tasks', len(queue_elems))
-                already_queue_count = 0
-                for e in queue_elems:
-                    text = str(e.text).strip()
-                    cnt = int(re.findall(r'([0-9]+)', text, re.MULTILINE)[0])
-                    logging.debug("counting '%s' %d", text, cnt)
-                    already_queue_count += cnt
-                logging.info('found already queue task %d', already_queue_count)
-                if already_queue_count >= conf['troop_queue_max']:
-                    logging.info('queue is full')
-                    continue
+            # check current queue
+            unit_name = str(unit_input_elem.find_element_by_xpath('./preceding-sibling::div[contains(@class, "tit")]/a[2]').text)
+            logging.info('unit name is %s', unit_name)
+            queue_elems = self.driver.find_elements_by_xpath('//table[@class="under_progress"]//td[@class="desc" and contains(string(), "%s")]' % unit_name)
+            logging.debug('found %d current queue tasks', len(queue_elems))
+            already_queue_count = 0
+            for e in queue_elems:
+                text = str(e.text).strip()
+                cnt = int(re.findall(r'([0-9]+)', text, re.MULTILINE)[0])
+                logging.debug("counting '%s' %d", text, cnt)
+                already_queue_count += cnt
+            logging.info('found already queue task %d', already_queue_count)
+            if already_queue_count >= conf['troop_queue_max']:
+                logging.info('queue is full')
+                continue
 
-                # build with check village
-                task_value = min(
-                    available_unit_count,
-                    need_train - already_queue_count,
-                    conf['troop_queue_max'] - already_queue_count)
-                if task_value <= 0:
-                    logging.info('not need train more')
-                    continue
+            # build with check village
+            task_value = min(
+                available_unit_count,
+                need_train - already_queue_count,
+                conf['troop_queue_max'] - already_queue_count)
+            if task_value <= 0:
+                logging.info('not need train more')
+                continue
 
-                logging.info('send new troop build task %d', task_value)
-                unit_input_elem.clear()
-                unit_input_elem.send_keys(str(task_value))
-                self.driver.find_element_by_xpath('//button[@type="submit" and contains(@class, "startTraining")]').click()
-                send_desktop_notify('troop train %s %s %s' % (village, conf['troop_id'], task_value))
+            logging.info('send new troop build task %d', task_value)
+            unit_input_elem.clear()
+            unit_input_elem.send_keys(str(task_value))
+            self.driver.find_element_by_xpath('//button[@type="submit" and contains(@class, "startTraining")]').click()
+            send_desktop_notify('troop train %s %s %s' % (village, conf['troop_id'], task_value))
 
     def _send_army_to_farm(self):
         logging.info('send army to farm call')
@@ -605,28 +774,37 @@ class Manager(object):
             logging.info('not found farm list for automate')
             return
 
+        now = self.current_timestamp or time.time()
+        summary = self.reports.target_summary(now - config.RAID_HISTORY_WINDOW)
+        home_troops = self.__home_troops()
+        logging.info('raid history for %d targets, home troops known for %d villages', len(summary), len(home_troops))
+
         random.shuffle(patterns)
         for title in patterns:
+            self._yield_to_urgent()
             logging.info('process farm list %s', title)
 
             self.__goto_farmlist()
-            farm_list_id = self.__search_farmlist_id_by_title(title)
-            if not farm_list_id:
+            farm_list = find_farm_list(self.__farm_lists_snapshot(), title=title)
+            if not farm_list:
                 logging.warning('not found list')
                 continue
+            farm_list_id = farm_list['id']
 
-            # todo check available troops for green slots
-            # todo check available troops for orange slots
-
-            slots = self.__get_all_slots_by_farm_list(farm_list_id)
+            slots = farm_list['slots']
             enemies = []
-            for tr in slots:
-                raw_content = tr.get_attribute('innerHTML')
-                if not check_already_attacked_farm(raw_content):
-                    red_for_me = check_red_losses_farm(raw_content)
-                    id = tr.find_element_by_xpath('.//input[@type="checkbox"]').get_attribute('id')
-                    link = tr.find_element_by_xpath('.//td[@class="village"]/a').get_attribute('href')
-                    enemies.append({'id': id, 'link': link, 'is_red': red_for_me})
+            for slot in slots:
+                raw_content = slot['html']
+                if check_already_attacked_farm(raw_content):
+                    continue
+                red_for_me = check_red_losses_farm(raw_content)
+                enemies.append({'id': slot['id'], 'link': slot['link'], 'x': slot['x'], 'y': slot['y'],
+                                'is_red': red_for_me})
+
+                # incremental farm state update from row last raid info
+                row_state = extract_farm_report_state(raw_content, self.current_timestamp)
+                if row_state['report_class'] and slot['x'] is not None:
+                    self.farm_state.put_if_newer(slot['x'], slot['y'], row_state)
             logging.info('found %d slots - filtered to %d', len(slots), len(enemies))
             if not enemies:
                 continue
@@ -635,13 +813,24 @@ class Manager(object):
             logging.info('sorting to %d green full, %d green other, %d orange full, %d orange other',
                          len(green_full), len(green_other), len(orange_full), len(orange_other))
 
-            if green_full:
-                logging.info('try send %d green full', len(green_full))
-                self.__send_farm(farm_list_id, green_full, sort_by_distance=True)
-
-            if green_other:
-                logging.info('try send %d green other', len(green_other))
-                self.__send_farm(farm_list_id, green_other, sort_by_lastraid=True)
+            # list village is known by "village - list" title convention
+            village_name = title.split(' - ')[0] if ' - ' in title else None
+            available = home_troops.get(village_name) if village_name else None
+            factor = tournament_square_factor(village_name)
+            # carry full targets first, in own sends before the rest
+            for group_name, group in (('green full', set(green_full)), ('green other', set(green_other))):
+                if not group:
+                    continue
+                candidates = [slot for slot in slots if slot['id'] in group]
+                states = {slot['id']: self.farm_state.get(slot['x'], slot['y'], config.FARM_STATE_TTL)
+                          for slot in candidates if slot['x'] is not None}
+                selected = prioritize_raids(candidates, summary, states, factor, available)
+                logging.info('try send %d of %d %s by yield per hour', len(selected), len(candidates), group_name)
+                # start raid sends ticked slots in list order: ranking holds only across batches
+                batch_size = config.RAID_SEND_BATCH_SIZE
+                for i in range(0, len(selected), batch_size):
+                    self._yield_to_urgent()
+                    self.__send_farm(farm_list_id, [slot['id'] for slot in selected[i:i + batch_size]])
 
             if config.ENABLE_SEND_CANNON_RUBBER_FARMS:
                 if orange_full:
@@ -680,6 +869,9 @@ class Manager(object):
                 self.__remove_farm_list(id)
                 send_desktop_notify('remove farm list %s' % name)
 
+        # refill right away as baseline loop did: own update schedule may be up to ~20 loops away
+        self._update_farm_lists()
+
     def _update_farm_lists(self):
         logging.info('process autofill farm list')
         res = self.__goto_farmlist()
@@ -692,14 +884,30 @@ class Manager(object):
 
         lists = config.AUTO_UPDATE_FARM_LISTS
         random.shuffle(lists)
+
+        # refresh only stale part of target area with minimal query set, candidates come from map grid index
+        target = set()
+        centers = [(conf['center_x'], conf['center_y']) for conf in lists]
         for conf in lists:
+            target |= area_tiles([(conf['center_x'], conf['center_y'])], conf.get('radius', config.MAP_WINDOW_RADIUS))
+        fresh = self.map_cache.fresh_centers(config.MAP_ZOOM_LEVEL, 'players')
+        for x, y, _ in plan_map_queries(target, fresh, centers=centers):
+            self.__extract_map_data(x, y, 'players')
+        logging.info('map regions refreshed (map cache %s)', self.map_cache.stats())
+
+        for conf in lists:
+            self._yield_to_urgent()
             logging.info('process farm collect config %s', conf)
 
-            source = self.__extract_map_data(conf['center_x'], conf['center_y'])
-            players = extract_players_from_source(source)
+            inh = conf.get('inh', {})
+            players = self.map_grid.villages_within(conf['center_x'], conf['center_y'],
+                                                    conf.get('radius', config.MAP_WINDOW_RADIUS),
+                                                    inh_min=inh.get('min', 0), inh_max=inh.get('max'),
+                                                    max_age=config.MAP_GRID_MAX_AGE)
             logging.info('found %d players', len(players))
 
             players_filter = apply_players_filter(players, conf, exist_villages)
+            players_filter = self.__order_by_travel_time(players_filter, conf)
             logging.info('filtered to %d players', len(players_filter))
 
             if not players_filter:
@@ -708,235 +916,180 @@ class Manager(object):
             if not self.__goto_farmlist():
                 continue
 
-            for p in players_filter:
-                id, title = self.__find_farmlist_for_add(conf['list_name'])
-                if not id:
-                    raise RuntimeError('not found farm list')
-                self.__add_to_farm_list(id, p, conf['troop_id'], conf['troop_count'])
+            added = self.__add_to_farm_lists(conf['list_name'], players_filter, conf['troop_id'], conf['troop_count'])
+            for p, title in added:
                 mask = unique_village_mask(p['v_name'], p['x'], p['y'])
                 logging.info('add player to farm %s %s', mask, title)
                 exist_villages.add(mask)
-                send_desktop_notify('add player to farm %s' % p['v_name'])
+            send_desktop_notify('add %d of %d players to farm %s' % (len(added), len(players_filter),
+                                                                      conf['list_name']))
 
     def _trading(self):
         if not config.AUCTION_BIDS:
             return
 
-        minimal_price = min(config.AUCTION_BIDS.values())
-        logging.info('trading start: minimal bid is %d', minimal_price)
+        logging.info('trading start')
         self.driver.get(self.AUCTION_PAGE)
+        source = self.driver.page_source
+        silver = parse_silver_amount(source)
+        rows = parse_auction_rows(source, self.driver.current_url)
+        logging.info('found %d auction rows, free coins %s', len(rows), silver)
+        if not silver:
+            logging.warning('coins too low')
+            return
 
-        i = 0
-        while i < 100:
-            i += 1
+        for bid in plan_bids(rows, config.AUCTION_BIDS, silver):
+            row = bid['row']
             try:
-                logging.info('trade loop %d', i)
-                silver_coins_str = self.driver.find_element_by_class_name('ajaxReplaceableSilverAmount').text
-                coins_count = int(silver_coins_str)
-                logging.info('free coins %d', coins_count)
-
-                if coins_count < minimal_price:
-                    logging.warning('coins too low')
-                    return
-
-                try:
-                    next_bid_elem = self.driver.find_element_by_xpath('//div[@id="auction"]//tbody/tr[%d]' % i)
-                except NoSuchElementException:
-                    logging.info('not found next bid %d', i)
-                    break
-
-                item_price = int(next_bid_elem.find_element_by_class_name('silver').text)
-                logging.info('item cost %s', item_price)
-
-                if coins_count < item_price:
-                    logging.info('skip by coins amount %d %d', item_price, coins_count)
-                    continue
-
-                item_name_str = next_bid_elem.find_element_by_class_name('name').text
-                logging.info('item name string %s', item_name_str)
-
-                item_count = int(re.findall(r'(\d+)‬×‬', item_name_str)[0])
-                logging.info('item count %d', item_count)
-
-                item_bid = None
-                for pattern, bid_value in config.AUCTION_BIDS.items():
-                    if pattern in item_name_str:
-                        logging.info('select %s item %d', pattern, bid_value)
-                        item_bid = bid_value
-                        break
-
-                if not item_bid:
-                    logging.info('skip not interested item')
-                    continue
-
-                if item_price / item_count >= item_bid:
-                    logging.info('skip by price')
-                    continue
-
-                try:
-                    bid_link = next_bid_elem.find_element_by_xpath('.//td[@class="bid"]/a[contains(text(), "bid")]')
-                except NoSuchElementException:
-                    logging.warning('not found bid link')
+                logging.info('bid try %s (%d pcs, price %d) by %d', row['name'], row['count'], row['price'], bid['bid'])
+                self.driver.get(row['bid_link'])
+                if not self.wait.element('//input[@name="maxBid"]', 'bid form'):
                     continue
-                bid_link.click()
-
-                bid = item_bid * item_count
-                logging.info('bid try %d', bid)
-                custom_wait()
-
-                self.driver.find_element_by_xpath('//input[@name="maxBid"]').send_keys(str(bid))
-                self.driver.find_element_by_xpath('//div[@class="submitBid"]/button[@type="submit"]').click()
+                self.driver.find_element_by_xpath('//input[@name="maxBid"]').send_keys(str(bid['bid']))
+                submit_elem = self.driver.find_element_by_xpath('//div[@class="submitBid"]/button[@type="submit"]')
+                submit_elem.click()
             except Exception as e:
                 logging.error(e)
             else:
                 logging.info('bid save')
-                custom_wait()
-                send_desktop_notify('trade: bid item %s by %d' % (item_name_str, bid))
-                self.driver.get(self.AUCTION_PAGE)
+                self.wait.reloaded(submit_elem, 'bid save')
+                send_desktop_notify('trade: bid item %s by %d' % (row['name'], bid['bid']))
 
     def _remove_uninteresting_reports(self):
         logging.info('remove reports call')
+        # own schedule with jitter may run before ingest: store reports first, never delete unstored ones
+        stored_id = None
+        if config.ENABLE_INGEST_REPORTS:
+            self._ingest_reports()
+            stored_id = self.reports.last_id()
         self.driver.get(self.REPORTS_PAGE)
-        reports_for_delete = self.driver.find_elements_by_xpath('//form[@id="reportsForm"]'
-                                                                '//table[@id="overview"]'
-                                                                '//td[contains(@class, "sub")]'
-                                                                '//img[contains(@alt, "%s") and contains(@class, "iReport1")]'
-                                                                '/ancestor::tr'
-                                                                '/td[contains(@class, "sel")]'
-                                                                '//input[@type="checkbox"]'
-                                                                % config.REPORTS_ATTACK_PATTERN1)
+        reports = parse_reports_overview(self.driver.page_source, self.driver.current_url)
+        reports_for_delete = [r['checkbox'] for r in reports
+                              if r['checkbox'] and r['report_class'] == 1 and config.REPORTS_ATTACK_PATTERN1 in r['alt']
+                              and (stored_id is None or (r['id'] and r['id'] <= stored_id))]
         logging.info('found %d reports for delete', len(reports_for_delete))
-        for checkbox in reports_for_delete:
-            checkbox.click()
 
         if reports_for_delete:
-            self.driver.find_element_by_id('del').click()
-            custom_wait()
-
-    def __extract_summary_casualties(self):
-        total = 0
-        casualties = 0
-        try:
-            table = self.driver.find_element_by_id('attacker')
-        except NoSuchElementException:
-            logging.warning('not found attacker info on report view')
-        else:
-            expression = './/th[contains(text(), "%s")]/parent::tr/td[contains(@class, "unit") and text() != "0"]'
-            troops = table.find_elements_by_xpath(expression % config.REPORTS_TROOPS_PATTERN)
-            casualties = table.find_elements_by_xpath(expression % config.REPORTS_CASUALTIES_PATTERN)
-            prisoners = table.find_elements_by_xpath(expression % config.REPORTS_PRISONERS_PATTERN)
-            logging.info('found %d casualties and %d prisoners and %d troops', len(casualties), len(prisoners), len(troops))
-            total = sum([int(i.text) for i in troops])
-            casualties = sum([int(i.text) for i in casualties + prisoners])
-            logging.info('summary %d/%d', total, casualties)
+            self.driver.execute_script(CLICK_ELEMENTS_SCRIPT, [
+                '//form[@id="reportsForm"]//input[@type="checkbox" and @name="%s"]' % name
+                for name in reports_for_delete])
+            delete_elem = self.driver.find_element_by_id('del')
+            delete_elem.click()
+            self.wait.reloaded(delete_elem, 'reports delete')
+
+    def _ingest_reports(self):
+        logging.info('ingest reports call')
+        last_id = self.reports.last_id()
+        new_reports = []
+        for page in range(1, config.REPORTS_INGEST_MAX_PAGES + 1):
+            self.driver.get(self.REPORTS_LIST_PAGE % page)
+            rows = parse_reports_overview(self.driver.page_source, self.driver.current_url)
+            fresh = [r for r in rows if r['id'] and r['id'] > last_id]
+            logging.info('reports page %d: %d rows, %d new', page, len(rows), len(fresh))
+            new_reports.extend(fresh)
+            if not rows or len(fresh) < len(rows):
+                break
 
-        return total, casualties
+        # oldest first: interrupted run resumes after last stored id
+        for row in sorted(new_reports, key=lambda r: r['id']):
+            self._yield_to_urgent()
+            self.driver.get(row['link'])
+            report = parse_report_page(self.driver.page_source, self.current_timestamp)
+            if report['reported_at'] is None:
+                report['reported_at'] = parse_report_time(row['date'], self.current_timestamp)
+            logging.debug('ingest report %d %s', row['id'], report)
+            self.reports.add(row['id'], row['title'], row['report_class'], report)
+
+            if row['report_class'] in REPORT_CLASS_NAMES and report['target_x'] is not None:
+                self.farm_state.put_if_newer(report['target_x'], report['target_y'], {
+                    'report_class': REPORT_CLASS_NAMES[row['report_class']],
+                    'carry_full': report['carry_full'],
+                    'report_at': report['reported_at'],
+                })
+        logging.info('ingested %d reports', len(new_reports))
 
     def __filter_farms_by_last_report(self, farms):
-        green_full, green_other, orange_full, orange_other = [], [], [], []
+        buckets = {'green_full': [], 'green_other': [], 'orange_full': [], 'orange_other': []}
+        visits = 0
         for i, v in enumerate(farms):
             id = v['id']
-            logging.info('check last report %s %s', i, id)
-            self.driver.get(v['link'])
-            last_attack_report = None
-            try:
-                last_attack_report = self.driver.find_element_by_xpath('//table[@id="troop_info"]'
-                                                                       '//td/img[contains(@class, "iReport")]'
-                                                                       '[contains(@alt, "%s") or contains(@alt, "%s") or contains(@alt, "%s")]'
-                                                                       '/parent::td'
-                                                                       % (config.FARM_LIST_ATTACK_PATTERN1,
-                                                                          config.FARM_LIST_ATTACK_PATTERN2,
-                                                                          config.FARM_LIST_ATTACK_PATTERN3))
-            except NoSuchElementException:
-                logging.info('not found last attack report')
-
-            if not last_attack_report:
-                if not v['is_red']:
-                    logging.info('mark as green other by not found last report')
-                    green_other.append(id)
-                continue
-
-            source = last_attack_report.get_attribute('innerHTML')
-            is_full_carry = check_full_carry_farm(source)
-            is_green = check_green_losses_farm(source)
-            is_orange = check_orange_losses_farm(source)
-            is_today = config.REPORTS_TODAY_PATTERN in source
-            is_recently_attacked = check_recently_attacked_farm(source, self.current_timestamp)
-
-            if is_green and is_full_carry:
-                logging.info('mark as green full')
-                green_full.append(id)
-                continue
-
-            if is_orange and is_full_carry:
-                logging.info('mark as orange full')
-                orange_full.append(id)
-                continue
-
-            if is_green and not is_recently_attacked:
-                logging.info('mark as green other by not recently attacked')
-                green_other.append(id)
+            has_coords = v['x'] is not None and v['y'] is not None
+            state = self.farm_state.get(v['x'], v['y'], config.FARM_STATE_TTL) if has_coords else None
+            if state is None:
+                logging.info('check last report %s %s', i, id)
+                visits += 1
+                state = self.__fetch_farm_report_state(v['link'])
+                if has_coords:
+                    self.farm_state.put(v['x'], v['y'], state)
+
+            kind = classify_farm(state, v['is_red'], self.current_timestamp)
+            if not kind:
+                logging.info('skip farm slot %s', id)
                 continue
+            logging.info('mark %s as %s', id, kind)
+            buckets[kind].append(id)
 
-            if is_orange and not is_today:
-                logging.info('mark as orange other by not today')
-                orange_other.append(id)
-                continue
-
-            logging.info('skip farm slot')
-            # if is_orange :
-            #     try:
-            #         link = last_attack_report.find_element_by_tag_name('a').get_attribute('href')
-            #         logging.debug('report link %s', link)
-            #         self.driver.get(link)
-            #     except NoSuchElementException:
-            #         logging.warning('not found report link')
-            #         continue
-            #     total, casualties = self.__extract_summary_casualties()
-
-        return green_full, green_other, orange_full, orange_other
-
-    def __find_troop_train_building(self, troop_id):
-
-        def _search_input():
-            return self.driver.find_element_by_xpath('//div[contains(@class, "trainUnits")]//input[@name="%s"]' % troop_id)
-
-        try:
-            self.driver.find_element_by_xpath(
-                '//div[@id="sidebarBoxActiveVillage"]//button[contains(@class, "barracksWhite")]').click()
-            unit_input_elem = _search_input()
-            logging.info('unit found in barracks')
-            return unit_input_elem
-        except NoSuchElementException:
-            pass
-
-        try:
-            self.driver.find_element_by_xpath(
-                '//div[@id="sidebarBoxActiveVillage"]//button[contains(@class, "stableWhite")]').click()
-            unit_input_elem = _search_input()
-            logging.info('unit found in stable')
-            return unit_input_elem
-        except NoSuchElementException:
-            pass
+        logging.info('classified %d farms with %d village page visits', len(farms), visits)
+        return buckets['green_full'], buckets['green_other'], buckets['orange_full'], buckets['orange_other']
 
+    def __fetch_farm_report_state(self, link):
+        self.driver.get(link)
         try:
-            self.driver.find_element_by_xpath(
-                '//div[@id="sidebarBoxActiveVillage"]//button[contains(@class, "workshopWhite")]').click()
-            unit_input_elem = _search_input()
-            logging.info('unit found in workshop')
-            return unit_input_elem
+            last_attack_report = self.driver.find_element_by_xpath('//table[@id="troop_info"]'
+                                                                   '//td/img[contains(@class, "iReport")]'
+                                                                   '[contains(@alt, "%s") or contains(@alt, "%s") or contains(@alt, "%s")]'
+                                                                   '/parent::td'
+                                                                   % (config.FARM_LIST_ATTACK_PATTERN1,
+                                                                      config.FARM_LIST_ATTACK_PATTERN2,
+                                                                      config.FARM_LIST_ATTACK_PATTERN3))
         except NoSuchElementException:
-            pass
-
+            logging.info('not found last attack report')
+            return extract_farm_report_state('', self.current_timestamp)
+
+        return extract_farm_report_state(last_attack_report.get_attribute('innerHTML'), self.current_timestamp)
+
+    def __find_troop_train_building(self, village_name, troop_id):
+        """open training building of village with input for troop, building per troop remembered in registry"""
+        village = self.__village(village_name)
+        if not village:
+            logging.warning('village %s not found', village_name)
+            return None
+
+        input_xpath = '//div[contains(@class, "trainUnits")]//input[@name="%s"]' % troop_id
+        known_gid = village['units'].get(troop_id)
+        for gid in [known_gid] if known_gid else config.TRAIN_BUILDING_GIDS:
+            url = self.villages.building_url(village['name'], gid)
+            if not url:
+                continue
+            self.driver.get(url)
+            self.villages.active = village['name']
+            # without implicit wait: building without this unit has no input
+            if self.driver.execute_script(XPATH_PRESENT_SCRIPT, input_xpath):
+                logging.info('unit found in building gid %d', gid)
+                if gid != known_gid:
+                    self.villages.set_unit_building(village['name'], troop_id, gid)
+                return self.driver.find_element_by_xpath(input_xpath)
         return None
 
-    def __find_current_unit_count(self, unit_id, village):
-        self.driver.get(self.TROOPS_OVERVIEW_PAGE)
-        return int(self.driver.find_element_by_xpath('//table[@id="troops"]'
-                                                     '//th[contains(@class, "vil")]'
-                                                     '/a[text()="%s"]'
-                                                     '/ancestor::tr//td[%s]' %
-                                                     (village, unit_id[1:])).text)
+    def __home_troops(self):
+        """village -> {troop id: count at home}; without home tab total counts are used as upper bound"""
+        tab = 'home' if 'home' in config.TROOPS_OVERVIEW_TABS else 'total'
+        if tab not in config.TROOPS_OVERVIEW_TABS:
+            return {}
+        if tab != 'home':
+            logging.info('no home troops tab - cap raids by total troops')
+        self.driver.get(config.HOST + config.TROOPS_OVERVIEW_TABS[tab])
+        return {village: {'t%d' % (i + 1): count for i, count in enumerate(counts)}
+                for village, counts in parse_troops_overview(self.driver.page_source).items()}
+
+    def __troops_matrix(self):
+        """village -> {tab: unit counts} from troops overview tabs, one page load per tab"""
+        matrix = {}
+        for kind, path in config.TROOPS_OVERVIEW_TABS.items():
+            self.driver.get(config.HOST + path)
+            for village, counts in parse_troops_overview(self.driver.page_source).items():
+                matrix.setdefault(village, {})[kind] = counts
+        return matrix
 
     def __goto_farmlist(self):
         if not self.FARM_LIST_PAGE:
@@ -950,9 +1103,11 @@ class Manager(object):
             farm_list_tab = self.driver.find_element_by_xpath(
                 '//a[@class="tabItem" and contains(text(), "%s")]' % config.FARM_LIST_TAB_PATTERN)
             self.FARM_LIST_PAGE = farm_list_tab.get_attribute('href')
+            self._save_session()
 
         self.driver.get(self.FARM_LIST_PAGE)
-        custom_wait()
+        self.wait.element('//div[@id="raidList"]', 'farm list')
+        self.wait.ajax_idle()
         return True
 
     def __goto_sendarmy_tab(self):
@@ -967,68 +1122,118 @@ class Manager(object):
             send_army_tab = self.driver.find_element_by_xpath(
                 '//a[@class="tabItem" and contains(text(), "%s")]' % config.SEND_ARMY_TAB_PATTERN)
             self.SEND_ARMY_PAGE = send_army_tab.get_attribute('href')
+            self._save_session()
 
         self.driver.get(self.SEND_ARMY_PAGE)
-        custom_wait()
+        self.wait.element('//form[@name="snd"]', 'send army form')
         return True
 
-    def __get_all_slots_by_farm_list(self, id):
-        return self.__search_farmlist_by_id(id).find_elements_by_class_name('slotRow')
+    def __farm_lists_snapshot(self):
+        return parse_farm_lists(self.driver.page_source, self.driver.current_url)
 
     def __search_farmlist_by_id(self, id):
         return self.driver.find_element_by_xpath('//div[@id="%s"]' % id)
 
     def __search_farmlist_id_by_title(self, title_pattern):
-        farm_lists = self.driver.find_elements_by_xpath('//div[@id="raidList"]/div[contains(@class, "listEntry")]')
-        for list_element in farm_lists:
-            title = str(list_element.find_element_by_class_name('listTitleText').text).strip()
-            logging.info('search farm list %s', title)
-            if title_pattern == title:
-                return list_element.get_attribute('id')
-        return None
-
-    def __find_farmlist_for_add(self, title_pattern):
-        while True:
-            id = self.__search_farmlist_id_by_title(title_pattern)
-            if not id:
+        farm_list = find_farm_list(self.__farm_lists_snapshot(), title=title_pattern)
+        return farm_list['id'] if farm_list else None
+
+    def __order_by_travel_time(self, players, conf):
+        """nearest by travel time of conf troops from center first, optional max_hours cut"""
+        if not players:
+            return players
+        hours = travel_hours(distances(conf['center_x'], conf['center_y'], [p['x'] for p in players],
+                                       [p['y'] for p in players]), army_speed({conf['troop_id']: 1}))
+        max_hours = conf.get('max_hours')
+        return [p for h, p in sorted(zip(hours.tolist(), players), key=lambda i: i[0])
+                if max_hours is None or h <= max_hours]
+
+    def __add_to_farm_lists(self, title_pattern, players, troop_id, troop_count):
+        """fill list (and its overflow copies title_, title__...) with players, capacity checked once per list"""
+        added = []
+        pending = list(players)
+        farm_lists = self.__farm_lists_snapshot()
+        while pending:
+            farm_list = find_farm_list(farm_lists, title=title_pattern)
+            if not farm_list:
                 self.__create_farm_list(title_pattern)
                 send_desktop_notify('create new farm list %s' % title_pattern)
-                id = self.__search_farmlist_id_by_title(title_pattern)
-                return id, title_pattern
+                farm_lists = self.__farm_lists_snapshot()
+                if not find_farm_list(farm_lists, title=title_pattern):
+                    raise RuntimeError('not found farm list')
+                continue
+
+            logging.info('counter %s/%s', farm_list['slots_used'], farm_list['slots_total'])
+            free = len(pending) if farm_list['slots_total'] is None else \
+                farm_list['slots_total'] - farm_list['slots_used']
+            if free <= 0:
+                logging.info('list is full - next loop')
+                title_pattern += '_'
+                continue
 
-            free_slot_elem = self.__search_farmlist_by_id(id).find_element_by_xpath(
-                './/div[@class="addSlot"]/span[@class="raidListSlotCount"]')
+            list_id = farm_list['id']
+            chunk, pending = pending[:free], pending[free:]
+            if config.FARM_LIST_BULK_ADD:
+                accepted = self.__bulk_add_to_farm_list(list_id, chunk, troop_id, troop_count)
+                self.__goto_farmlist()
+                farm_list = find_farm_list(self.__farm_lists_snapshot(), id=list_id)
+                if not farm_list:
+                    # unknown result - dialog fallback could duplicate slots that did land
+                    logging.warning('farm list %s not found after bulk add, skip dialog fallback', list_id)
+                    added.extend((p, title_pattern) for p in accepted)
+                    farm_lists = self.__farm_lists_snapshot()
+                    continue
+                exist = set((slot['x'], slot['y']) for slot in farm_list['slots'])
+            else:
+                exist = set()
+
+            for p in chunk:
+                if (p['x'], p['y']) not in exist:
+                    if config.FARM_LIST_BULK_ADD:
+                        # bulk request rejected - fall back to dialog
+                        logging.warning('slot %s (%d|%d) not added in bulk, use dialog', p['v_name'], p['x'], p['y'])
+                    self.__add_to_farm_list(list_id, p, troop_id, troop_count)
+                added.append((p, title_pattern))
+            farm_lists = self.__farm_lists_snapshot()
+        return added
+
+    def __bulk_add_to_farm_list(self, id, players, troop_id, troop_count):
+        """submit add-slot form once per player from one in-page script"""
+        logging.info('bulk add %d slots to farm list %s', len(players), id)
+        self.__close_all_dialogs()
+        self.__search_farmlist_by_id(id).find_element_by_xpath(
+            './/div[@class="addSlot"]/button[@value="%s"]' % config.FARM_LIST_ADD_BUTTON_PATTERN).click()
+        if not self.wait.element('//*[@id="raidListSlot"]', 'farm slot dialog'):
+            return []
 
-            counter = str(free_slot_elem.text)
-            logging.info('counter %s', counter)
-            usage = int(re.findall(r'(\d+)', counter)[0])
-            total = int(re.findall(r'(\d+)', counter)[1])
-            if usage < total:
-                return id, title_pattern
-            logging.info('list is full - next loop')
-            title_pattern += '_'
+        self.driver.set_script_timeout(config.FARM_LIST_BULK_TIMEOUT)
+        result = self.driver.execute_async_script(
+            BULK_ADD_SLOTS_SCRIPT, [[p['x'], p['y']] for p in players], troop_id, str(troop_count))
+        self.__close_all_dialogs()
+        if result.get('error'):
+            logging.warning('bulk add failed: %s', result['error'])
+            return []
+        logging.info('bulk add: %d/%d requests accepted', sum(result['added']), len(players))
+        return [p for p, ok in zip(players, result['added']) if ok]
 
     def __extract_exist_villages_from_farmlist(self):
         res = []
-        slots = self.driver.find_elements_by_xpath('//tr[@class="slotRow"]')
-        for tr in slots:
-            try:
-                el = tr.find_element_by_class_name('village').find_element_by_tag_name('a')
-                v_name = el.text
-            except NoSuchElementException:
-                continue
-
-            try:
-                x = int(re.findall(r'x=([-]?\d+)', el.get_attribute('href'))[0])
-                y = int(re.findall(r'y=([-]?\d+)', el.get_attribute('href'))[0])
-            except IndexError:
-                logging.warning('invalid farmlist slot %s', v_name)
-                continue
-
-            res.append(unique_village_mask(v_name, x, y))
+        for farm_list in self.__farm_lists_snapshot():
+            for slot in farm_list['slots']:
+                if not slot['v_name']:
+                    continue
+                if slot['x'] is None or slot['y'] is None:
+                    logging.warning('invalid farmlist slot %s', slot['v_name'])
+                    continue
+                res.append(unique_village_mask(slot['v_name'], slot['x'], slot['y']))
         return set(res)
 
     def __find_rally_point_build(self):
+        for name in [self.villages.active] + sorted(self.villages.villages):
+            url = self.villages.building_url(name, config.BUILDING_GIDS['rally_point']) if name else None
+            if url:
+                return url
+
         self.driver.get(self.VILLAGE_PAGE)
         map_content = self.driver.find_element_by_id('village_map')
         builds = map_content.find_elements_by_tag_name('area')
@@ -1039,61 +1244,45 @@ class Manager(object):
                 return str(b.get_attribute('href'))
         return None
 
-    def __extract_map_data(self, x: int, y: int):
-        """emulate ajax request for fetch response with selenium"""
-        self.driver.get(self.MAP_PAGE)
-        custom_wait()
-
-        form_html = """
-            <form id="randomFormId" method="POST" action="%s">
-                <input type="text" name="cmd" value="mapPositionData"></input>
-                <input type="text" name="data[x]" value="%d"></input>
-                <input type="text" name="data[y]" value="%d"></input>
-                <input type="text" name="data[zoomLevel]" value="3"></input>
-                <input type="text" name="ajaxToken" value="%s"></input>
-                <input type="submit"/>
-            </form>
-            """ % (self.MAP_DATA_PAGE, x, y, self.ajax_token)
-        elem = self.driver.find_element_by_tag_name('body')
-        script = "arguments[0].innerHTML += '%s';" % form_html.replace("\n", '')
-        logging.debug(script)
-
-        self.driver.execute_script(script, elem)
-        my_form = self.driver.find_element_by_id('randomFormId')
-        my_form.submit()
-        custom_wait()
-        return self.driver.find_element_by_tag_name('pre').text
+    def __extract_map_data(self, x: int, y: int, kind: str):
+        """fetch map region around coords via ajax endpoint (cached by kind ttl), fresh data goes to map grid"""
+        def _load():
+            data = self.ajax.map_position_data(x, y, config.MAP_ZOOM_LEVEL)
+            self.map_grid.update_region(data)
+            return data
+
+        return self.map_cache.fetch(x, y, config.MAP_ZOOM_LEVEL, kind, _load)
+
+    def __check_oases(self, oases):
+        """measure animals of oases as bounded-concurrency batch, results go to oasis index"""
+        if not oases:
+            return
+
+        def _evaluate(coords):
+            return extract_oases_enemy_troops_from_source(self.__get_tile_info(*coords))
+
+        with ThreadPoolExecutor(max_workers=config.HERO_TERROR_PARALLELISM) as executor:
+            futures = {executor.submit(_evaluate, coords): coords for coords in oases}
+            for future in as_completed(futures):
+                coords = futures[future]
+                try:
+                    troops = future.result()
+                except Exception as e:
+                    logging.warning('oases %s check error %s', coords, e)
+                    continue
+                self.oases.put(coords[0], coords[1], troops)
+                logging.info('oases %s enemy strength %d', coords, troops_strength(troops))
 
     def __get_tile_info(self, x: int, y: int):
-        """emulate ajax request for fetch oasis info"""
-        self.driver.get(self.MAP_PAGE)
-        custom_wait()
-
-        form_html = """
-                <form id="randomFormId" method="POST" action="%s">
-                    <input type="text" name="cmd" value="viewTileDetails"></input>
-                    <input type="text" name="x" value="%d"></input>
-                    <input type="text" name="y" value="%d"></input>
-                    <input type="text" name="ajaxToken" value="%s"></input>
-                    <input type="submit"/>
-                </form>
-                """ % (self.TILE_DATA_PAGE, x, y, self.ajax_token)
-        elem = self.driver.find_element_by_tag_name('body')
-        script = "arguments[0].innerHTML += '%s';" % form_html.replace("\n", '')
-        logging.debug(script)
-
-        self.driver.execute_script(script, elem)
-        my_form = self.driver.find_element_by_id('randomFormId')
-        my_form.submit()
-        custom_wait()
-        return self.driver.find_element_by_tag_name('pre').text
+        """fetch oasis/village details via ajax endpoint"""
+        return self.ajax.tile_details(x, y)
 
     def __create_farm_list(self, list_name):
         logging.info('create new farm list %s', list_name)
         village_name, list_name = list_name.split(' - ')
 
         self.driver.find_element_by_xpath('//div[@class="options"]/a[@class="arrow"]').click()
-        custom_wait()
+        self.wait.element('//*[@id="raidListCreate"]', 'farm list create form')
 
         create_elem = self.driver.find_element_by_id('raidListCreate')
         create_elem.find_element_by_xpath('.//input[@name="listName"]').send_keys(list_name)
@@ -1103,22 +1292,23 @@ class Manager(object):
 
         create_elem.find_element_by_xpath(
             './/button[@value="%s"]' % config.FARM_LIST_CREATE_BUTTON_PATTERN).click()
-        custom_wait()
+        self.wait.reloaded(create_elem, 'farm list create')
         self.__goto_farmlist()
 
     def __remove_farm_list(self, list_id):
         logging.info('remove farm list %s', list_id)
         self.__search_farmlist_by_id(list_id).find_element_by_xpath('.//button[@id="deleteRaidList"]').click()
-        custom_wait()
-        self.driver.find_element_by_xpath('//button[@type="submit" and contains(@class, "dialogButtonOk")]').click()
-        custom_wait()
+        confirm_xpath = '//button[@type="submit" and contains(@class, "dialogButtonOk")]'
+        self.wait.element(confirm_xpath, 'farm list remove dialog')
+        confirm_elem = self.driver.find_element_by_xpath(confirm_xpath)
+        confirm_elem.click()
+        self.wait.reloaded(confirm_elem, 'farm list remove')
 
     def __add_to_farm_list(self, id, p, troop_id, troop_count):
-        custom_wait()
         self.__close_all_dialogs()
         self.__search_farmlist_by_id(id).find_element_by_xpath(
             './/div[@class="addSlot"]/button[@value="%s"]' % config.FARM_LIST_ADD_BUTTON_PATTERN).click()
-        custom_wait()
+        self.wait.element('//*[@id="raidListSlot"]', 'farm slot dialog')
 
         form = self.driver.find_element_by_id('raidListSlot')
         form.find_element_by_id('xCoordInput').clear()
@@ -1131,7 +1321,8 @@ class Manager(object):
         troop_input.send_keys(str(troop_count))
 
         form.find_element_by_id('save').click()
-        custom_wait()
+        self.wait.dialog_closed()
+        self.wait.ajax_idle()
 
     def __send_orange_farm(self, link):
         logging.info('send to %s', link)
@@ -1169,52 +1360,26 @@ class Manager(object):
         send_desktop_notify('send cannon rubber farm band')
         return True
 
-    def __send_farm(self, id, slot_ids, sort_by_distance=False, sort_by_lastraid=False):
+    def __send_farm(self, id, slot_ids):
         self.__goto_farmlist()
-        if sort_by_distance:
-            logging.info('sort list by distance')
-            sort_column = self.__search_farmlist_by_id(id).find_element_by_xpath(
-                './/td[contains(@class, "lastRaid") and contains(@class, "sortable")]')
-            sort_column.click()
-            custom_wait()
-            sort_column = self.__search_farmlist_by_id(id).find_element_by_xpath(
-                './/td[contains(@class, "distance") and contains(@class, "sortable")]')
-            sort_column.click()
-            custom_wait()
-
-        if sort_by_lastraid:
-            logging.info('sort list by last raid')
-            sort_column = self.__search_farmlist_by_id(id).find_element_by_xpath(
-                './/td[contains(@class, "distance") and contains(@class, "sortable")]')
-            sort_column.click()
-            custom_wait()
-            sort_column = self.__search_farmlist_by_id(id).find_element_by_xpath(
-                './/td[contains(@class, "lastRaid") and contains(@class, "sortable")]')
-            sort_column.click()
-            custom_wait()
-
-        selected = False
-        for tr in self.__get_all_slots_by_farm_list(id):
-            raw_content = tr.get_attribute('innerHTML')
-
-            # ignore if currently attacked
-            if check_already_attacked_farm(raw_content):
-                continue
-
-            checkbox_elem = tr.find_element_by_xpath('.//input[@type="checkbox"]')
-            if checkbox_elem.get_attribute('id') in slot_ids:
-                checkbox_elem.click()
-                selected = True
-
+        farm_list = find_farm_list(self.__farm_lists_snapshot(), id=id)
+        # ignore if currently attacked
+        selected = [slot['id'] for slot in farm_list['slots'] if slot['id'] in slot_ids and
+                    not check_already_attacked_farm(slot['html'])] if farm_list else []
         if not selected:
             logging.info('not selected raids')
             return
 
+        logging.info('select %d raids', len(selected))
+        self.driver.execute_script(CLICK_ELEMENTS_SCRIPT, [
+            '//div[@id="%s"]//input[@type="checkbox" and @id="%s"]' % (id, slot_id) for slot_id in selected])
+
         logging.info('send farm')
         button = self.__search_farmlist_by_id(id).find_element_by_xpath(
             './/button[contains(@value, "%s")]' % config.FARM_LIST_SEND_BUTTON_PATTERN)
         button.click()
-        custom_wait()
+        self.wait.element('//div[@id="%s"]//p[contains(text(), "%s")]' % (id, config.FARM_LIST_SEND_RESULT_PATTERN),
+                          'farm list send result')
         try:
             result = self.__search_farmlist_by_id(id).find_element_by_xpath(
                 './/p[contains(text(), "%s")]' % config.FARM_LIST_SEND_RESULT_PATTERN)
@@ -1230,16 +1395,22 @@ class Manager(object):
             for e in elems:
                 try:
                     e.click()
-                    custom_wait()
+                    self.wait.dialog_closed()
                 except Exception as e:
                     pass
 
     def __select_village(self, name):
-        village_link = self.driver.find_element_by_xpath('//div[@id="sidebarBoxVillagelist"]//li//a'
-                                                  '/div[@class="name" and contains(text(), "%s")]'
-                                                  '/parent::a' % name)
-        village_link.click()
-        custom_wait()
+        """switch active village on current page, no-op for already active village"""
+        village = self.__village(name)
+        if not village or not village['newdid']:
+            logging.warning('village %s not found', name)
+            return False
+        if self.villages.active == village['name']:
+            logging.info('village %s already active', village['name'])
+            return True
+        self.driver.get(with_newdid(self.driver.current_url, village['newdid']))
+        self.villages.active = village['name']
+        return True
 
 
 if __name__ == '__main__':
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import time
+import zlib
+
+from storage import open_db
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS map_regions (
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    zoom_level INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    payload BLOB NOT NULL,
+    PRIMARY KEY (x, y, zoom_level)
+);
+"""
+
+
+class MapCache(object):
+    """on-disk cache of mapPositionData responses keyed by (x, y, zoomLevel)"""
+
+    def __init__(self, ttls: dict, db_name='map_cache.sqlite'):
+        self.ttls = ttls
+        self.conn = open_db(db_name, SCHEMA)
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, x: int, y: int, zoom_level: int, kind: str):
+        row = self.conn.execute('SELECT fetched_at, payload FROM map_regions '
+                                'WHERE x = ? AND y = ? AND zoom_level = ?', (x, y, zoom_level)).fetchone()
+        if not row or time.time() - row['fetched_at'] > self.ttls[kind]:
+            return None
+        return json.loads(zlib.decompress(row['payload']).decode('utf-8'))
+
+    def put(self, x: int, y: int, zoom_level: int, data: dict):
+        payload = zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+        self.conn.execute('INSERT OR REPLACE INTO map_regions (x, y, zoom_level, fetched_at, payload) '
+                          'VALUES (?, ?, ?, ?, ?)', (x, y, zoom_level, time.time(), payload))
+        self.conn.commit()
+
+    def fetch(self, x: int, y: int, zoom_level: int, kind: str, loader):
+        data = self.get(x, y, zoom_level, kind)
+        if data is not None:
+            self.hits += 1
+            logging.info('map cache hit %d %d %d (%s)', x, y, zoom_level, kind)
+            return data
+
+        self.misses += 1
+        logging.info('map cache miss %d %d %d (%s)', x, y, zoom_level, kind)
+        data = loader()
+        self.put(x, y, zoom_level, data)
+        return data
+
+    def fresh_centers(self, zoom_level: int, kind: str):
+        """centers of cached regions still fresh for kind"""
+        rows = self.conn.execute('SELECT x, y FROM map_regions WHERE zoom_level = ? AND fetched_at >= ?',
+                                 (zoom_level, time.time() - self.ttls[kind])).fetchall()
+        return [(r['x'], r['y']) for r in rows]
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
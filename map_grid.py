@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import math
+import time
+
+import config
+from map_parser import covered_coords, parse_map_tiles
+from storage import open_db
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS map_tiles (
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    uid INTEGER,
+    name TEXT,
+    v_name TEXT,
+    ally TEXT,
+    race INTEGER,
+    inh INTEGER,
+    seen_at REAL NOT NULL,
+    PRIMARY KEY (x, y)
+);
+"""
+FIELDS = ('x', 'y', 'kind', 'uid', 'name', 'v_name', 'ally', 'race', 'inh', 'seen_at')
+
+
+def normalize_coord(value: int) -> int:
+    """wrap coordinate into [-MAP_RADIUS, MAP_RADIUS]"""
+    size = 2 * config.MAP_RADIUS + 1
+    return (value + config.MAP_RADIUS) % size - config.MAP_RADIUS
+
+
+def map_distance(x1: int, y1: int, x2: int, y2: int) -> float:
+    """euclidean distance on wrap-around map"""
+    size = 2 * config.MAP_RADIUS + 1
+    dx = abs(x1 - x2) % size
+    dy = abs(y1 - y2) % size
+    return math.hypot(min(dx, size - dx), min(dy, size - dy))
+
+
+class MapGrid(object):
+    """index of known map tiles (villages, free and owned oases) with on-disk copy"""
+
+    def __init__(self, db_name='map_grid.sqlite'):
+        self.conn = open_db(db_name, SCHEMA)
+        self.tiles = {}
+        for row in self.conn.execute('SELECT %s FROM map_tiles' % ', '.join(FIELDS)):
+            self.tiles[(row['x'], row['y'])] = dict(row)
+        logging.info('map grid loaded %d tiles', len(self.tiles))
+
+    def close(self):
+        self.conn.close()
+
+    def update_region(self, source, seen_at=None):
+        """replace every tile covered by mapPositionData response"""
+        seen_at = seen_at or time.time()
+        covered = covered_coords(source)
+        map_tiles = parse_map_tiles(source)
+
+        records = []
+        for p in map_tiles.players:
+            records.append({'x': p['x'], 'y': p['y'], 'kind': 'village', 'uid': p['id'], 'name': p['name'],
+                            'v_name': p['v_name'], 'ally': p['ally'], 'race': p['race'], 'inh': p['inh'],
+                            'seen_at': seen_at})
+        for x, y in map_tiles.free_oases:
+            records.append({'x': x, 'y': y, 'kind': 'oasis', 'uid': None, 'name': None, 'v_name': None,
+                            'ally': None, 'race': None, 'inh': None, 'seen_at': seen_at})
+        for o in map_tiles.owned_oases:
+            records.append({'x': o['x'], 'y': o['y'], 'kind': 'owned_oasis', 'uid': o['id'], 'name': None,
+                            'v_name': None, 'ally': None, 'race': None, 'inh': None, 'seen_at': seen_at})
+
+        for coords in covered:
+            self.tiles.pop(coords, None)
+        for r in records:
+            self.tiles[(r['x'], r['y'])] = r
+
+        self.conn.executemany('DELETE FROM map_tiles WHERE x = ? AND y = ?', covered)
+        self.conn.executemany('INSERT OR REPLACE INTO map_tiles (%s) VALUES (%s)' % (
+            ', '.join(FIELDS), ', '.join('?' * len(FIELDS))), [tuple(r[f] for f in FIELDS) for r in records])
+        self.conn.commit()
+        logging.info('map grid region updated: %d covered, %d known tiles', len(covered), len(records))
+
+    def within(self, x: int, y: int, radius: float, kind=None, max_age=None):
+        """tiles within radius of (x, y), nearest first"""
+        now = time.time()
+        r = int(math.ceil(radius))
+        result = []
+        for dy in range(-r, r + 1):
+            for dx in range(-r, r + 1):
+                distance = math.hypot(dx, dy)
+                if distance > radius:
+                    continue
+                tile = self.tiles.get((normalize_coord(x + dx), normalize_coord(y + dy)))
+                if not tile or (kind and tile['kind'] != kind):
+                    continue
+                if max_age is not None and now - tile['seen_at'] > max_age:
+                    continue
+                result.append((distance, tile))
+        result.sort(key=lambda i: i[0])
+        return [tile for _, tile in result]
+
+    def villages_within(self, x: int, y: int, radius: float, inh_min=0, inh_max=None, max_age=None):
+        """player villages (extract_players_from_source format) within radius, population in [min, max]"""
+        result = []
+        for tile in self.within(x, y, radius, kind='village', max_age=max_age):
+            if tile['inh'] < inh_min or (inh_max is not None and tile['inh'] > inh_max):
+                continue
+            if tile['name'] in config.IGNORE_FARM_PLAYERS or tile['ally'] in config.IGNORE_FARM_ALLY:
+                continue
+            result.append({'x': tile['x'], 'y': tile['y'], 'id': tile['uid'], 'ally': tile['ally'],
+                           'name': tile['name'], 'race': tile['race'], 'inh': tile['inh'], 'v_name': tile['v_name']})
+        return result
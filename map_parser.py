@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import re
+from collections import namedtuple
+from json import loads
+
+# "{k.spieler} name<br />{k.einwohner} 123<br />..." -> ('spieler', 'name'), ('einwohner', '123'), ...
+TILE_FIELD_RE = re.compile(r'\{k\.(\w+)\}\s*(.*?)\s*(?:<br\s*/>|$)')
+RACE_RE = re.compile(r'\{a\.v(\d)\}')
+VILLAGE_NAME_RE = re.compile(r'\{k\.dt\}\s*(.*)')
+OASIS_BONUS_RE = re.compile(r'(?:25|50)%')
+
+MapTiles = namedtuple('MapTiles', ['players', 'free_oases', 'owned_oases'])
+
+
+def decode_source(source):
+    if isinstance(source, (str, bytes)):
+        return loads(source)
+    return source
+
+
+def parse_map_tiles(source) -> MapTiles:
+    """single pass over mapPositionData tiles: player villages, free and owned oases"""
+    map_dict = decode_source(source)
+    players, free_oases, owned_oases = [], [], []
+
+    for tile in map_dict['response']['data']['tiles']:
+        title = tile.get('t')
+        if 'u' not in tile:
+            if title and tile.get('d') == -1 and OASIS_BONUS_RE.search(title):
+                free_oases.append((int(tile['x']), int(tile['y'])))
+            continue
+
+        fields = dict(TILE_FIELD_RE.findall(title)) if title else {}
+        if not fields.get('einwohner', '').isdigit():
+            # players oasis
+            owned_oases.append({'x': int(tile['x']), 'y': int(tile['y']), 'id': int(tile['u'])})
+            continue
+
+        race = RACE_RE.search(fields.get('volk', ''))
+        village_name = VILLAGE_NAME_RE.search(tile.get('c', ''))
+        if not race or not village_name:
+            logging.warning('invalid player tile %s %s', tile.get('x'), tile.get('y'))
+            continue
+
+        players.append({
+            'x': int(tile['x']),
+            'y': int(tile['y']),
+            'id': int(tile['u']),
+            'ally': fields.get('allianz', ''),
+            'name': fields.get('spieler', ''),
+            'race': int(race.group(1)),
+            'inh': int(fields['einwohner']),
+            'v_name': village_name.group(1).strip()
+        })
+
+    return MapTiles(players, free_oases, owned_oases)
+
+
+def covered_coords(source):
+    """all coords present in mapPositionData response (empty tiles included)"""
+    map_dict = decode_source(source)
+    return [(int(tile['x']), int(tile['y'])) for tile in map_dict['response']['data']['tiles']]
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""plan minimal set of mapPositionData queries covering target area"""
+
+import logging
+import math
+
+import numpy as np
+
+import config
+from map_grid import normalize_coord
+
+
+def area_tiles(centers, radius: float):
+    """normalized coords within radius of any center"""
+    r = int(math.ceil(radius))
+    result = set()
+    for cx, cy in centers:
+        for dy in range(-r, r + 1):
+            for dx in range(-r, r + 1):
+                if math.hypot(dx, dy) <= radius:
+                    result.add((normalize_coord(cx + dx), normalize_coord(cy + dy)))
+    return result
+
+
+def window_tiles(x: int, y: int, half: int):
+    return {(normalize_coord(x + dx), normalize_coord(y + dy))
+            for dy in range(-half, half + 1) for dx in range(-half, half + 1)}
+
+
+def _drop_redundant(windows, remaining, half):
+    """drop windows whose tiles are all covered by the others"""
+    coverage = {w: window_tiles(w[0], w[1], half) & remaining for w in windows}
+    for w in sorted(coverage, key=lambda i: len(coverage[i])):
+        others = set()
+        for other, tiles in coverage.items():
+            if other != w:
+                others |= tiles
+        if coverage[w] <= others:
+            del coverage[w]
+    return list(coverage)
+
+
+def _greedy_cover(remaining, side: int):
+    """greedy set cover over every window position: take window with most uncovered tiles until none left
+
+    window tile counts for all positions come from one 2d prefix sum per round
+    """
+    # unwrap around reference tile so area crossing map edge stays contiguous
+    ref_x, ref_y = next(iter(remaining))
+    points = np.array([(ref_x + normalize_coord(x - ref_x), ref_y + normalize_coord(y - ref_y))
+                       for x, y in remaining])
+    # grid padded by side - 1, so every window touching a point has its corner inside
+    origin_x, origin_y = points[:, 0].min() - side + 1, points[:, 1].min() - side + 1
+    width = points[:, 0].max() - origin_x + side
+    height = points[:, 1].max() - origin_y + side
+    grid = np.zeros((height, width), dtype=np.int32)
+    grid[points[:, 1] - origin_y, points[:, 0] - origin_x] = 1
+
+    windows = []
+    while grid.any():
+        sums = np.zeros((height + 1, width + 1), dtype=np.int32)
+        sums[1:, 1:] = grid.cumsum(0).cumsum(1)
+        counts = sums[side:, side:] - sums[:-side, side:] - sums[side:, :-side] + sums[:-side, :-side]
+        row, col = np.unravel_index(counts.argmax(), counts.shape)
+        grid[row:row + side, col:col + side] = 0
+        windows.append((int(origin_x + col + side // 2), int(origin_y + row + side // 2)))
+    return windows
+
+
+def plan_map_queries(target, fresh_centers=(), zoom_level=None, half=None, centers=()):
+    """window centers (x, y, zoomLevel) covering target tiles not covered by fresh windows
+
+    windows are squares of 2 * half + 1 tiles; coords wrap on map edges. cover is greedy set cover over
+    all window positions; with area centers given it is never worse than one window per area
+    """
+    zoom_level = zoom_level or config.MAP_ZOOM_LEVEL
+    half = config.MAP_WINDOW_RADIUS if half is None else half
+
+    remaining = set(target)
+    for x, y in fresh_centers:
+        remaining -= window_tiles(x, y, half)
+    if not remaining:
+        return []
+
+    windows = _drop_redundant(_greedy_cover(remaining, 2 * half + 1), remaining, half)
+    if centers:
+        by_area = _drop_redundant([(x, y) for x, y in set(centers) if window_tiles(x, y, half) & remaining],
+                                  remaining, half)
+        covered = set()
+        for x, y in by_area:
+            covered |= window_tiles(x, y, half)
+        if remaining <= covered and len(by_area) < len(windows):
+            windows = by_area
+
+    result = [(normalize_coord(x), normalize_coord(y), zoom_level) for x, y in windows]
+    logging.info('map plan: %d target tiles, %d not fresh, %d queries', len(target), len(remaining), len(result))
+    return result
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""per-task cost accounting: wall time, wait time, webdriver and http round trips
+
+export as prometheus textfile (node_exporter textfile collector) and json-lines time series
+"""
+
+import json
+import logging
+import os
+import time
+
+import config
+
+COUNTERS = ('wall_seconds', 'wait_seconds', 'webdriver_calls', 'webdriver_seconds', 'http_calls', 'http_seconds')
+PROMETHEUS_HELP = {
+    'runs': 'task runs',
+    'failures': 'failed task runs',
+    'wall_seconds': 'task wall time without nested urgent tasks',
+    'wait_seconds': 'time spent in explicit waits',
+    'webdriver_calls': 'webdriver remote commands',
+    'webdriver_seconds': 'time spent in webdriver remote commands',
+    'http_calls': 'direct http requests',
+    'http_seconds': 'time spent in direct http requests',
+}
+
+
+class Metrics(object):
+    """accumulates costs of running task; nested (urgent) tasks are accounted separately"""
+
+    def __init__(self, account='', state_dir=None):
+        state_dir = state_dir or config.STATE_DIR
+        os.makedirs(state_dir, exist_ok=True)
+        self.account = account
+        self.prometheus_path = os.path.join(state_dir, config.METRICS_PROMETHEUS_FILE)
+        self.jsonl_path = os.path.join(state_dir, config.METRICS_JSONL_FILE)
+        self.totals = {}
+        self.last = {}
+        self.stack = []
+
+    def _frame(self):
+        return self.stack[-1] if self.stack else None
+
+    def _add(self, counter, value):
+        frame = self._frame()
+        if frame:
+            frame['counters'][counter] += value
+
+    # instrumentation
+
+    def instrument_driver(self, driver):
+        """count every remote command (driver methods and WebElement calls go through driver.execute)"""
+        execute = driver.execute
+
+        def _execute(driver_command, params=None):
+            started = time.time()
+            try:
+                return execute(driver_command, params)
+            finally:
+                self._add('webdriver_calls', 1)
+                self._add('webdriver_seconds', time.time() - started)
+        driver.execute = _execute
+        return driver
+
+    def instrument_waiter(self, waiter):
+        until = waiter.until
+
+        def _until(condition, label):
+            started = time.time()
+            try:
+                return until(condition, label)
+            finally:
+                self._add('wait_seconds', time.time() - started)
+        waiter.until = _until
+        return waiter
+
+    def instrument_session(self, session):
+        """requests session used by ajax client"""
+        request = session.request
+
+        def _request(*args, **kwargs):
+            started = time.time()
+            try:
+                return request(*args, **kwargs)
+            finally:
+                self._add('http_calls', 1)
+                self._add('http_seconds', time.time() - started)
+        session.request = _request
+        return session
+
+    # task accounting
+
+    def task_started(self, name):
+        self.stack.append({'name': name, 'started': time.time(), 'nested': 0.,
+                           'counters': dict.fromkeys(COUNTERS, 0)})
+
+    def task_finished(self, ok):
+        frame = self.stack.pop()
+        finished = time.time()
+        elapsed = finished - frame['started']
+        counters = frame['counters']
+        counters['wall_seconds'] = elapsed - frame['nested']
+        parent = self._frame()
+        if parent:
+            parent['nested'] += elapsed
+
+        name = frame['name']
+        totals = self.totals.setdefault(name, dict(dict.fromkeys(COUNTERS, 0), runs=0, failures=0))
+        totals['runs'] += 1
+        totals['failures'] += 0 if ok else 1
+        for key, value in counters.items():
+            totals[key] += value
+
+        previous = self.last.get(name)
+        period = frame['started'] - previous['started'] if previous else None
+        self.last[name] = {'started': frame['started'], 'duration': elapsed, 'period': period}
+
+        record = dict(counters, time=finished, account=self.account, task=name, ok=ok, period_seconds=period)
+        logging.info('task %s cost: %.1f sec wall, %.1f sec waits, %d webdriver calls (%.1f sec), %d http calls',
+                     name, counters['wall_seconds'], counters['wait_seconds'], counters['webdriver_calls'],
+                     counters['webdriver_seconds'], counters['http_calls'])
+        try:
+            self._append_jsonl(record)
+            self.write_prometheus()
+        except OSError as e:
+            logging.warning('metrics export error %s', e)
+
+    # export
+
+    def _append_jsonl(self, record):
+        with open(self.jsonl_path, 'a') as f:
+            f.write(json.dumps(record, sort_keys=True) + '\n')
+
+    def _labels(self, task):
+        return 'account="%s",task="%s"' % (self.account.replace('"', '\\"'), task)
+
+    def write_prometheus(self):
+        lines = []
+        for key in ('runs', 'failures') + COUNTERS:
+            metric = 'travian_task_%s_total' % key
+            lines.append('# HELP %s %s' % (metric, PROMETHEUS_HELP[key]))
+            lines.append('# TYPE %s counter' % metric)
+            for task, totals in sorted(self.totals.items()):
+                lines.append('%s{%s} %s' % (metric, self._labels(task), totals[key]))
+
+        for key, help_text in (('duration', 'last run duration'), ('period', 'time between last two starts')):
+            metric = 'travian_task_last_%s_seconds' % key
+            lines.append('# HELP %s %s' % (metric, help_text))
+            lines.append('# TYPE %s gauge' % metric)
+            for task, last in sorted(self.last.items()):
+                if last[key] is not None:
+                    lines.append('%s{%s} %s' % (metric, self._labels(task), last[key]))
+
+        # write-then-rename so collector never reads half-written file
+        tmp_path = self.prometheus_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, self.prometheus_path)
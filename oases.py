@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""measured oasis animals with regeneration estimate, ranking of hero targets"""
+
+import json
+import logging
+import time
+
+import numpy as np
+
+import config
+from storage import open_db
+from travel import distances, travel_hours
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS oases (
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    troops TEXT NOT NULL,
+    strength INTEGER NOT NULL,
+    checked_at REAL NOT NULL,
+    PRIMARY KEY (x, y)
+);
+"""
+
+
+def troops_strength(troops: dict) -> int:
+    """{animal name: count} -> strength by NATURE_ENEMIES_STRENGTH"""
+    out = 0
+    for name, count in troops.items():
+        try:
+            index = [i for i in config.NATURE_ENEMIES_STRENGTH if i in name][0]
+            out += count * config.NATURE_ENEMIES_STRENGTH[index]
+        except IndexError:
+            logging.warning('undefined nature troop %s', name)
+    return out
+
+
+class OasisIndex(object):
+    """last measured animals per oasis; strength between checks is estimated with regeneration rate"""
+
+    def __init__(self, db_name='oases.sqlite'):
+        self.conn = open_db(db_name, SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, x: int, y: int):
+        row = self.conn.execute('SELECT troops, strength, checked_at FROM oases WHERE x = ? AND y = ?',
+                                (x, y)).fetchone()
+        if not row:
+            return None
+        return {'troops': json.loads(row['troops']), 'strength': row['strength'], 'checked_at': row['checked_at']}
+
+    def put(self, x: int, y: int, troops: dict, checked_at=None):
+        self.conn.execute('INSERT OR REPLACE INTO oases (x, y, troops, strength, checked_at) VALUES (?, ?, ?, ?, ?)',
+                          (x, y, json.dumps(troops), troops_strength(troops), checked_at or time.time()))
+        self.conn.commit()
+
+    def mark_cleared(self, x: int, y: int):
+        """hero sent: animals assumed killed, strength regrows from zero"""
+        self.put(x, y, {})
+
+    def estimate(self, x: int, y: int, now=None):
+        """(estimated strength, is fresh) or None for never checked oasis"""
+        entry = self.get(x, y)
+        if entry is None:
+            return None
+        age = (now or time.time()) - entry['checked_at']
+        strength = entry['strength'] + config.OASIS_REGEN_STRENGTH_PER_HOUR * age / 3600.
+        return min(strength, config.OASIS_MAX_STRENGTH), age <= config.OASIS_STRENGTH_TTL
+
+
+def hero_strength_window():
+    """(min, max) animal strength hero with escort can take"""
+    max_strength = config.HERO_TERROR_MAX_ENEMIES_STRENGTH
+    if config.HERO_TERROR_ESCORT_ATTACK:
+        max_strength = min(max_strength, config.HERO_TERROR_ESCORT_COUNT * config.HERO_TERROR_ESCORT_ATTACK +
+                           config.HERO_TERROR_HERO_ATTACK)
+    return config.HERO_TERROR_MIN_ENEMIES_STRENGTH, max_strength
+
+
+def rank_oases(oases, index: OasisIndex, origin, speed: float, factor=1., now=None):
+    """[(xp per hour, coords, estimated strength, is fresh), ...] best first, only known oases inside window
+
+    killed animal strength is used as hero xp estimate, time is round trip of army with given speed
+    and tournament square factor
+    """
+    min_strength, max_strength = hero_strength_window()
+    known = []
+    for coords in oases:
+        estimate = index.estimate(coords[0], coords[1], now)
+        if estimate is None:
+            continue
+        strength, is_fresh = estimate
+        if min_strength <= strength <= max_strength:
+            known.append((coords, strength, is_fresh))
+    if not known:
+        return []
+
+    xs = np.array([k[0][0] for k in known])
+    ys = np.array([k[0][1] for k in known])
+    hours = (2 * travel_hours(np.maximum(distances(origin[0], origin[1], xs, ys), 1.), speed, factor)).tolist()
+    result = [(strength / h, coords, strength, is_fresh) for (coords, strength, is_fresh), h in zip(known, hours)]
+    result.sort(reverse=True)
+    return result
+
+
+def rank_with_rechecks(oases, index: OasisIndex, origin, speed: float, factor, check, rounds=None, top=None):
+    """rank_oases, re-measuring stale leaders with check(coords list) up to rounds times; ranking is
+    always rebuilt after last check"""
+    rounds = config.HERO_TERROR_RECHECK_ROUNDS if rounds is None else rounds
+    top = config.HERO_TERROR_RECHECK_TOP if top is None else top
+    ranked = rank_oases(oases, index, origin, speed, factor)
+    for _ in range(rounds):
+        stale = [coords for _, coords, _, is_fresh in ranked[:top] if not is_fresh]
+        if not stale:
+            break
+        check(stale)
+        ranked = rank_oases(oases, index, origin, speed, factor)
+    return ranked
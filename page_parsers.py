@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""snapshot parsers: take driver.page_source once and extract structured records"""
+
+import re
+
+import lxml.html as l
+from lxml.etree import XPath
+
+COORD_X_RE = re.compile(r'x=([-]?\d+)')
+COORD_Y_RE = re.compile(r'y=([-]?\d+)')
+NUMBER_RE = re.compile(r'(\d+)')
+FLOAT_RE = re.compile(r'(\d+(?:\.\d+)?)')
+AUCTION_COUNT_RE = re.compile(r'(\d+)‬×‬')
+
+FARM_LISTS_XPATH = XPath('//div[@id="raidList"]/div[contains(@class, "listEntry")]')
+FARM_LIST_TITLE_XPATH = XPath('.//*[contains(@class, "listTitleText")]')
+FARM_LIST_COUNTER_XPATH = XPath('.//div[@class="addSlot"]/span[@class="raidListSlotCount"]')
+FARM_SLOTS_XPATH = XPath('.//tr[contains(concat(" ", normalize-space(@class), " "), " slotRow ")]')
+SLOT_CHECKBOX_XPATH = XPath('.//input[@type="checkbox"]/@id')
+SLOT_VILLAGE_XPATH = XPath('.//td[contains(@class, "village")]/a')
+SLOT_DISTANCE_XPATH = XPath('.//td[contains(@class, "distance")]')
+SLOT_TROOP_ICONS_XPATH = XPath('.//td[contains(@class, "troops")]//img[contains(@class, "unit")]')
+UNIT_CLASS_RE = re.compile(r'\bu(\d+)\b')
+
+REPORT_ROWS_XPATH = XPath('//form[@id="reportsForm"]//table[@id="overview"]//tr[td]')
+REPORT_ICON_XPATH = XPath('.//td[contains(@class, "sub")]//img[contains(@class, "iReport")]')
+REPORT_LINK_XPATH = XPath('.//td[contains(@class, "sub")]//a[contains(@href, "id=")]')
+REPORT_CHECKBOX_XPATH = XPath('.//td[contains(@class, "sel")]//input[@type="checkbox"]')
+REPORT_DATE_XPATH = XPath('.//td[contains(@class, "dat")]')
+REPORT_ID_RE = re.compile(r'id=(\d+)')
+REPORT_CLASS_RE = re.compile(r'iReport(\d+)')
+
+SIDEBAR_VILLAGES_XPATH = XPath('//div[@id="sidebarBoxVillagelist"]//li//a[div[@class="name"]]')
+SIDEBAR_NAME_XPATH = XPath('./div[@class="name"]')
+SIDEBAR_COORD_X_XPATH = XPath('.//*[contains(@class, "coordinateX")]')
+SIDEBAR_COORD_Y_XPATH = XPath('.//*[contains(@class, "coordinateY")]')
+SIDEBAR_ACTIVE_XPATH = XPath('./ancestor::li[1][contains(@class, "active")]')
+SIGNED_NUMBER_RE = re.compile(r'(-?\d+)')
+NEWDID_RE = re.compile(r'newdid=(\d+)')
+
+OVERVIEW_ROWS_XPATH = XPath('//table[@id="overview"]//tr[td]')
+OVERVIEW_VILLAGE_XPATH = XPath('.//td[contains(@class, "vil")]//a')
+INCOMING_ATTACK_XPATH = XPath('.//img[contains(@class, "att1") or contains(@class, "att3")]')
+ATTACK_TIMERS_XPATH = XPath('//div[@id="map_details"]//div[contains(@class, "villageList")]'
+                            '//img[@class="att1" or @class="att3"]/ancestor::tr//span[@class="timer"]/@value')
+
+AUCTION_ROWS_XPATH = XPath('//div[@id="auction"]//table//tr[td]')
+AUCTION_NAME_XPATH = XPath('.//*[contains(@class, "name")]')
+AUCTION_PRICE_XPATH = XPath('.//*[contains(@class, "silver")]')
+AUCTION_TIMER_XPATH = XPath('.//span[contains(@class, "timer")]/@value')
+AUCTION_BID_XPATH = XPath('.//td[@class="bid"]/a[contains(text(), "bid")]/@href')
+TROOPS_ROWS_XPATH = XPath('//table[@id="troops"]//tr[th[contains(@class, "vil")]]')
+TROOPS_VILLAGE_XPATH = XPath('./th[contains(@class, "vil")]/a')
+TROOPS_UNITS_XPATH = XPath('./td')
+
+BUILDING_SLOTS_XPATH = XPath('//div[@id="village_map"]//*[contains(@class, "buildingSlot")]')
+BUILDING_SLOT_RE = re.compile(r'\ba(\d+)\b')
+BUILDING_GID_RE = re.compile(r'\bg(\d+)\b')
+
+SILVER_AMOUNT_XPATH = XPath('//*[contains(@class, "ajaxReplaceableSilverAmount")]')
+
+
+def _text(elems):
+    return elems[0].text_content().strip() if elems else ''
+
+
+def _first(values, default=None):
+    return values[0] if values else default
+
+
+def _document(source, base_url=None):
+    document = l.fromstring(source)
+    if base_url:
+        document.make_links_absolute(base_url)
+    return document
+
+
+def _slot_troops(tr):
+    """{troop id: count}, tribe unit numbers (u14, u24...) folded to t1..t10"""
+    result = {}
+    for img in SLOT_TROOP_ICONS_XPATH(tr):
+        unit = UNIT_CLASS_RE.findall(img.get('class', ''))
+        count = NUMBER_RE.findall(img.getparent().text_content())
+        if unit and count:
+            troop_id = 't%d' % ((int(unit[0]) - 1) % 10 + 1)
+            result[troop_id] = result.get(troop_id, 0) + int(count[0])
+    return result
+
+
+def parse_farm_slot(tr):
+    village = SLOT_VILLAGE_XPATH(tr)
+    link = village[0].get('href', '') if village else ''
+    x = COORD_X_RE.findall(link)
+    y = COORD_Y_RE.findall(link)
+    distance = FLOAT_RE.findall(_text(SLOT_DISTANCE_XPATH(tr)))
+    return {
+        'id': _first(SLOT_CHECKBOX_XPATH(tr)),
+        'v_name': _text(village),
+        'link': link,
+        'x': int(x[0]) if x else None,
+        'y': int(y[0]) if y else None,
+        'distance': float(distance[0]) if distance else None,
+        'troops': _slot_troops(tr),
+        'html': l.tostring(tr, encoding='unicode'),
+    }
+
+
+def parse_farm_lists(source, base_url=None):
+    """farm list page -> [{id, title, slots_used, slots_total, slots: [...]}, ...]"""
+    document = _document(source, base_url)
+    result = []
+    for entry in FARM_LISTS_XPATH(document):
+        counter = NUMBER_RE.findall(_text(FARM_LIST_COUNTER_XPATH(entry)))
+        result.append({
+            'id': entry.get('id'),
+            'title': _text(FARM_LIST_TITLE_XPATH(entry)),
+            'slots_used': int(counter[0]) if len(counter) > 1 else None,
+            'slots_total': int(counter[1]) if len(counter) > 1 else None,
+            'slots': [parse_farm_slot(tr) for tr in FARM_SLOTS_XPATH(entry)],
+        })
+    return result
+
+
+def find_farm_list(farm_lists, title=None, id=None):
+    for farm_list in farm_lists:
+        if (title is None or farm_list['title'] == title) and (id is None or farm_list['id'] == id):
+            return farm_list
+    return None
+
+
+def parse_reports_overview(source, base_url=None):
+    """reports page -> [{id, link, title, alt, report_class, checkbox, date}, ...]"""
+    document = _document(source, base_url)
+    result = []
+    for tr in REPORT_ROWS_XPATH(document):
+        link = REPORT_LINK_XPATH(tr)
+        if not link:
+            continue
+        href = link[0].get('href', '')
+        report_id = REPORT_ID_RE.findall(href)
+        icon = REPORT_ICON_XPATH(tr)
+        report_class = REPORT_CLASS_RE.findall(icon[0].get('class', '')) if icon else []
+        checkbox = REPORT_CHECKBOX_XPATH(tr)
+        result.append({
+            'id': int(report_id[0]) if report_id else None,
+            'link': href,
+            'title': link[0].text_content().strip(),
+            'alt': icon[0].get('alt', '') if icon else '',
+            'report_class': int(report_class[0]) if report_class else None,
+            'checkbox': checkbox[0].get('name') if checkbox else None,
+            'date': _text(REPORT_DATE_XPATH(tr)),
+        })
+    return result
+
+
+def _coordinate(elems):
+    value = SIGNED_NUMBER_RE.findall(elems[0].text_content().replace('\u2212', '-')) if elems else []
+    return int(value[0]) if value else None
+
+
+def parse_sidebar_villages(source, base_url=None):
+    """sidebar village list -> [{name, link, newdid, x, y, active}, ...]"""
+    document = _document(source, base_url)
+    result = []
+    for a in SIDEBAR_VILLAGES_XPATH(document):
+        link = a.get('href', '')
+        newdid = NEWDID_RE.findall(link)
+        result.append({
+            'name': _text(SIDEBAR_NAME_XPATH(a)),
+            'link': link,
+            'newdid': int(newdid[0]) if newdid else None,
+            'x': _coordinate(SIDEBAR_COORD_X_XPATH(a)),
+            'y': _coordinate(SIDEBAR_COORD_Y_XPATH(a)),
+            'active': bool(SIDEBAR_ACTIVE_XPATH(a)),
+        })
+    return result
+
+
+def parse_villages_overview(source, base_url=None):
+    """dorf3 overview -> [{name, link, under_attack}, ...] (empty if overview not available)"""
+    document = _document(source, base_url)
+    result = []
+    for tr in OVERVIEW_ROWS_XPATH(document):
+        village = OVERVIEW_VILLAGE_XPATH(tr)
+        if not village:
+            continue
+        result.append({
+            'name': village[0].text_content().strip(),
+            'link': village[0].get('href', ''),
+            'under_attack': bool(INCOMING_ATTACK_XPATH(tr)),
+        })
+    return result
+
+
+def parse_incoming_attack_timers(source):
+    """village page -> seconds left for every incoming attack"""
+    return [int(v) for v in ATTACK_TIMERS_XPATH(l.fromstring(source)) if v.lstrip('-').isdigit()]
+
+
+def parse_auction_rows(source, base_url=None):
+    """auction page -> [{index, name, count, price, time_left, bid_link}, ...]"""
+    document = _document(source, base_url)
+    result = []
+    for i, tr in enumerate(AUCTION_ROWS_XPATH(document), 1):
+        name = _text(AUCTION_NAME_XPATH(tr))
+        price = NUMBER_RE.findall(_text(AUCTION_PRICE_XPATH(tr)))
+        count = AUCTION_COUNT_RE.findall(name)
+        time_left = _first(AUCTION_TIMER_XPATH(tr))
+        result.append({
+            'index': i,
+            'name': name,
+            'count': int(count[0]) if count else 1,
+            'price': int(price[0]) if price else None,
+            'time_left': int(time_left) if time_left and time_left.lstrip('-').isdigit() else None,
+            'bid_link': _first(AUCTION_BID_XPATH(tr)),
+        })
+    return result
+
+
+def parse_silver_amount(source):
+    """hero silver from page header or None"""
+    value = NUMBER_RE.findall(_text(SILVER_AMOUNT_XPATH(l.fromstring(source))).replace(',', '').replace('.', ''))
+    return int(value[0]) if value else None
+
+
+def parse_troops_overview(source):
+    """dorf3 troops tab -> {village name: [unit counts in column order]}"""
+    result = {}
+    for tr in TROOPS_ROWS_XPATH(l.fromstring(source)):
+        village = TROOPS_VILLAGE_XPATH(tr)
+        if not village:
+            continue
+        counts = [td.text_content().strip() for td in TROOPS_UNITS_XPATH(tr)]
+        result[village[0].text_content().strip()] = [int(c) if c.isdigit() else 0 for c in counts]
+    return result
+
+
+def parse_building_slots(source):
+    """dorf2 village map -> {gid: slot id} for built buildings"""
+    result = {}
+    for elem in BUILDING_SLOTS_XPATH(l.fromstring(source)):
+        classes = elem.get('class', '')
+        slot = BUILDING_SLOT_RE.findall(classes)
+        gid = BUILDING_GID_RE.findall(classes)
+        if slot and gid and gid[0] != '0':
+            result.setdefault(int(gid[0]), int(slot[0]))
+    return result
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""debug profiler of webdriver round trips grouped by calling Manager line"""
+
+import math
+import os
+import sys
+import time
+
+
+def percentile(values, q):
+    """nearest-rank percentile of sorted values"""
+    if not values:
+        return 0.
+    # q * n first: q / 100. * n picks up float error (95 / 100. * 20 > 19)
+    index = max(0, min(len(values) - 1, int(math.ceil(q * len(values) / 100.)) - 1))
+    return values[index]
+
+
+class RoundTripProfiler(object):
+    """records every remote command with the first caller frame from source file (manage.py by default)"""
+
+    def __init__(self, source_file):
+        self.source_file = os.path.abspath(source_file).rsplit('.', 1)[0]
+        self.calls = {}
+
+    def attach(self, driver):
+        # WebElement methods go through parent driver.execute too, so one hook sees every command
+        execute = driver.execute
+
+        def _execute(driver_command, params=None):
+            site = self._call_site()
+            started = time.time()
+            try:
+                return execute(driver_command, params)
+            finally:
+                self.calls.setdefault((site, driver_command), []).append(time.time() - started)
+        driver.execute = _execute
+        return driver
+
+    def _call_site(self):
+        frame = sys._getframe(2)
+        while frame:
+            code = frame.f_code
+            if os.path.abspath(code.co_filename).rsplit('.', 1)[0] == self.source_file:
+                return '%s:%d' % (code.co_name, frame.f_lineno)
+            frame = frame.f_back
+        return '<other>'
+
+    def reset(self):
+        self.calls = {}
+
+    def report(self, top=30):
+        """call sites ranked by total latency"""
+        rows = []
+        for (site, command), durations in self.calls.items():
+            durations = sorted(durations)
+            rows.append((sum(durations), site, command, len(durations), percentile(durations, 50),
+                         percentile(durations, 95), durations[-1]))
+        rows.sort(reverse=True)
+
+        total = sum(r[0] for r in rows)
+        count = sum(r[3] for r in rows)
+        lines = ['webdriver round trips: %d calls, %.1f sec' % (count, total),
+                 '%-45s %-24s %7s %9s %8s %8s %8s' % ('call site', 'command', 'count', 'total s', 'p50 ms',
+                                                       'p95 ms', 'max ms')]
+        for total_time, site, command, calls, p50, p95, slowest in rows[:top]:
+            lines.append('%-45s %-24s %7d %9.2f %8.1f %8.1f %8.1f' % (
+                site, command, calls, total_time, p50 * 1000, p95 * 1000, slowest * 1000))
+        return '\n'.join(lines)
+
+    def dump(self, path, top=30):
+        report = self.report(top)
+        with open(path, 'w') as f:
+            f.write(report + '\n')
+        return report
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""farm list slots ordered by expected bounty per travel hour"""
+
+import logging
+
+import numpy as np
+
+import config
+from travel import army_speed, travel_hours
+
+
+def expected_bounty(slot, summary: dict, state):
+    """average bounty of recent raids, raised for carry-full targets and reduced by losses"""
+    entry = summary.get((slot['x'], slot['y']))
+    bounty = entry['avg_bounty'] if entry and entry['avg_bounty'] else config.RAID_DEFAULT_BOUNTY
+    full_ratio = 1. if state and state['carry_full'] else (entry['full_ratio'] or 0.) if entry else 0.
+    losses_ratio = (entry['losses_ratio'] or 0.) if entry else 0.
+    return bounty * (1. + (config.RAID_CARRY_FULL_FACTOR - 1.) * full_ratio) * (1. - losses_ratio)
+
+
+def raid_hours(slots, factor=1.):
+    """round trip hours per slot (troops are busy until return), speed of slowest unit in slot"""
+    distance = np.array([s['distance'] if s['distance'] is not None else config.RAID_DEFAULT_DISTANCE for s in slots])
+    speed = np.array([(army_speed(s['troops']) if s.get('troops') else None) or config.RAID_SPEED for s in slots])
+    return 2. * travel_hours(np.maximum(distance, 1.), speed, factor)
+
+
+def prioritize_raids(slots, summary: dict, states: dict, factor=1., available=None):
+    """slots best yield per hour first; with known available troops ({troop id: count}) only slots
+    whose troops still fit are taken and available is decreased in place"""
+    if not slots:
+        return []
+    hours = raid_hours(slots, factor).tolist()
+    scored = sorted(((expected_bounty(s, summary, states.get(s['id'])) / h, s) for s, h in zip(slots, hours)),
+                    key=lambda i: i[0], reverse=True)
+    result = []
+    for score, slot in scored:
+        troops = slot.get('troops') or {}
+        if available is not None and troops:
+            if any(available.get(troop_id, 0) < count for troop_id, count in troops.items()):
+                logging.info('skip slot %s: not enough troops', slot['id'])
+                continue
+            for troop_id, count in troops.items():
+                available[troop_id] -= count
+        logging.debug('raid slot %s score %.1f', slot['id'], score)
+        result.append(slot)
+    return result
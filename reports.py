@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+import calendar
+import datetime
+import json
+import re
+import time
+from itertools import zip_longest
+
+import lxml.html as l
+from lxml.etree import XPath
+
+import config
+from storage import open_db
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    report_class INTEGER,
+    attacker TEXT,
+    target_x INTEGER,
+    target_y INTEGER,
+    troops TEXT NOT NULL,
+    casualties TEXT NOT NULL,
+    troops_total INTEGER NOT NULL,
+    casualties_total INTEGER NOT NULL,
+    bounty INTEGER NOT NULL,
+    carry_full INTEGER NOT NULL,
+    reported_at REAL,
+    ingested_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reports_target ON reports (target_x, target_y, reported_at);
+CREATE INDEX IF NOT EXISTS reports_time ON reports (reported_at);
+"""
+
+REPORT_CLASS_NAMES = {1: 'green', 2: 'orange', 3: 'red'}
+
+ATTACKER_XPATH = XPath('//table[@id="attacker"]')
+ATTACKER_NAME_XPATH = XPath('.//a[contains(@href, "spieler.php")]')
+UNITS_ROW_XPATH = XPath('.//th[contains(text(), $pattern)]/parent::tr/td[contains(@class, "unit")]')
+BOUNTY_ROW_XPATH = XPath('.//th[contains(text(), $pattern)]/parent::tr/td')
+BOUNTY_RES_XPATH = XPath('.//div[contains(@class, "res")]//text()')
+TARGET_LINK_XPATH = XPath('//table[contains(@class, "defender") or @id="defender"]'
+                          '//a[contains(@href, "x=") and contains(@href, "y=")]/@href')
+TIME_XPATH = XPath('//div[@id="time"]')
+COORD_X_RE = re.compile(r'x=([-]?\d+)')
+COORD_Y_RE = re.compile(r'y=([-]?\d+)')
+NUMBER_RE = re.compile(r'(\d+)')
+DATETIME_RE = re.compile(config.REPORTS_DATETIME_PATTERN)
+
+
+def _units(table, pattern):
+    values = [td.text_content().strip() for td in UNITS_ROW_XPATH(table, pattern=pattern)]
+    return [int(v) if v.isdigit() else 0 for v in values]
+
+
+def parse_report_time(text, current_timestamp):
+    """report time ("today, HH:MM" or "dd.mm.yy, HH:MM[:SS]") to server timestamp"""
+    res = re.findall(config.REPORTS_TIME_PATTERN, text, re.MULTILINE)
+    if res and current_timestamp:
+        hour, minute = res[0]
+        server_time = datetime.datetime.utcfromtimestamp(current_timestamp)
+        return calendar.timegm(server_time.replace(hour=int(hour), minute=int(minute), second=0).timetuple())
+
+    res = DATETIME_RE.search(text)
+    if res:
+        day, month, year, hour, minute, second = res.groups()
+        return calendar.timegm((2000 + int(year), int(month), int(day), int(hour), int(minute), int(second or 0)))
+    return None
+
+
+def parse_report_page(source, current_timestamp=0):
+    """raid report page -> attacker, target coords, troops, casualties, bounty, carry flag, time"""
+    document = l.fromstring(source)
+    result = {
+        'attacker': None, 'target_x': None, 'target_y': None, 'troops': [], 'casualties': [],
+        'bounty': 0, 'carry_full': False, 'reported_at': None,
+    }
+
+    attacker = ATTACKER_XPATH(document)
+    if attacker:
+        table = attacker[0]
+        name = ATTACKER_NAME_XPATH(table)
+        result['attacker'] = name[0].text_content().strip() if name else None
+        result['troops'] = _units(table, config.REPORTS_TROOPS_PATTERN)
+        casualties = _units(table, config.REPORTS_CASUALTIES_PATTERN)
+        prisoners = _units(table, config.REPORTS_PRISONERS_PATTERN)
+        result['casualties'] = [a + b for a, b in zip_longest(casualties, prisoners, fillvalue=0)]
+
+        bounty = BOUNTY_ROW_XPATH(table, pattern=config.REPORTS_BOUNTY_PATTERN)
+        if bounty:
+            result['bounty'] = sum(int(i) for i in NUMBER_RE.findall(' '.join(BOUNTY_RES_XPATH(bounty[0]))))
+            result['carry_full'] = config.FARM_LIST_CARRY_FULL_PATTERN in l.tostring(bounty[0], encoding='unicode')
+
+    target = TARGET_LINK_XPATH(document)
+    if target:
+        x, y = COORD_X_RE.findall(target[0]), COORD_Y_RE.findall(target[0])
+        if x and y:
+            result['target_x'], result['target_y'] = int(x[0]), int(y[0])
+
+    time_elem = TIME_XPATH(document)
+    if time_elem:
+        result['reported_at'] = parse_report_time(time_elem[0].text_content(), current_timestamp)
+    return result
+
+
+class ReportStore(object):
+    """parsed reports indexed by target coords and time"""
+
+    def __init__(self, db_name='reports.sqlite'):
+        self.conn = open_db(db_name, SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def last_id(self):
+        row = self.conn.execute('SELECT MAX(id) AS id FROM reports').fetchone()
+        return row['id'] or 0
+
+    def add(self, report_id: int, title: str, report_class, report: dict):
+        self.conn.execute(
+            'INSERT OR REPLACE INTO reports (id, title, report_class, attacker, target_x, target_y, troops, '
+            'casualties, troops_total, casualties_total, bounty, carry_full, reported_at, ingested_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (report_id, title, report_class, report['attacker'], report['target_x'], report['target_y'],
+             json.dumps(report['troops']), json.dumps(report['casualties']), sum(report['troops']),
+             sum(report['casualties']), report['bounty'], int(report['carry_full']), report['reported_at'],
+             time.time()))
+        self.conn.commit()
+
+    def target_summary(self, since: float):
+        """(x, y) -> {raids, avg_bounty, full_ratio, losses_ratio, last_at} over reports newer than since"""
+        rows = self.conn.execute(
+            'SELECT target_x, target_y, COUNT(*) AS raids, AVG(bounty) AS avg_bounty, AVG(carry_full) AS full_ratio, '
+            'SUM(casualties_total) * 1.0 / MAX(SUM(troops_total), 1) AS losses_ratio, MAX(reported_at) AS last_at '
+            'FROM reports WHERE target_x IS NOT NULL AND reported_at >= ? '
+            'GROUP BY target_x, target_y', (since,)).fetchall()
+        return {(r['target_x'], r['target_y']): {
+            'raids': r['raids'], 'avg_bounty': r['avg_bounty'], 'full_ratio': r['full_ratio'],
+            'losses_ratio': r['losses_ratio'], 'last_at': r['last_at']} for r in rows}
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+import heapq
+import itertools
+import logging
+import random
+import time
+
+
+class Task(object):
+
+    def __init__(self, name, func, interval, priority, deadline=None, jitter=0.):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.priority = priority  # lower value is more urgent
+        self.deadline = deadline  # max seconds between due time and start
+        self.jitter = jitter
+        self.next_run = 0.
+        self.runs = 0
+        self.failures = 0
+        self.missed_deadlines = 0
+        self.last_duration = 0.
+
+    @property
+    def latest_start(self):
+        return self.next_run + (self.deadline if self.deadline is not None else self.interval)
+
+
+class Scheduler(object):
+    """priority queue of periodic tasks
+
+    due tasks are started by priority then by deadline; tasks becoming due while others wait
+    in the ready queue are inserted by the same rule, so urgent ones jump ahead.
+    long tasks call run_urgent() between steps to let urgent tasks preempt them
+    """
+
+    def __init__(self, clock=time.time, sleep=time.sleep, on_task_done=None):
+        self.clock = clock
+        self.sleep = sleep
+        self.on_task_done = on_task_done
+        self.tasks = []
+        self._pending = []  # (next_run, seq, task)
+        self._ready = []  # (priority, latest_start, seq, task)
+        self._seq = itertools.count()
+        self._in_urgent = False
+
+    def add(self, name, func, interval, priority, deadline=None, delay=0., jitter=0.):
+        task = Task(name, func, interval, priority, deadline, jitter)
+        task.next_run = self.clock() + delay
+        self.tasks.append(task)
+        heapq.heappush(self._pending, (task.next_run, next(self._seq), task))
+        return task
+
+    def _promote_due(self):
+        now = self.clock()
+        while self._pending and self._pending[0][0] <= now:
+            _, seq, task = heapq.heappop(self._pending)
+            heapq.heappush(self._ready, (task.priority, task.latest_start, seq, task))
+
+    def _reschedule(self, task):
+        task.next_run = self.clock() + task.interval * (1. + task.jitter * random.random())
+        heapq.heappush(self._pending, (task.next_run, next(self._seq), task))
+
+    def _run(self, task):
+        started = self.clock()
+        if started > task.latest_start:
+            task.missed_deadlines += 1
+            logging.warning('task %s missed deadline by %.1f sec', task.name, started - task.latest_start)
+
+        logging.info('run task %s (priority %d)', task.name, task.priority)
+        ok = False
+        try:
+            task.func()
+            ok = True
+        except Exception as e:
+            task.failures += 1
+            logging.error('task %s exception %s', task.name, e)
+        finally:
+            task.runs += 1
+            task.last_duration = self.clock() - started
+            logging.info('task %s done in %.1f sec', task.name, task.last_duration)
+            self._reschedule(task)
+        if self.on_task_done:
+            self.on_task_done(task, ok)
+
+    def run_next(self):
+        """run most urgent due task; return it or None if nothing is due"""
+        self._promote_due()
+        if not self._ready:
+            return None
+
+        task = heapq.heappop(self._ready)[3]
+        self._run(task)
+        return task
+
+    def run_urgent(self, max_priority: int):
+        """preempt point for long tasks: run due tasks with priority <= max_priority right now"""
+        if self._in_urgent:
+            return
+        self._in_urgent = True
+        try:
+            self._promote_due()
+            while self._ready and self._ready[0][0] <= max_priority:
+                self._run(heapq.heappop(self._ready)[3])
+                self._promote_due()
+        finally:
+            self._in_urgent = False
+
+    def next_delay(self):
+        if self._ready:
+            return 0.
+        if not self._pending:
+            return None
+        return max(0., self._pending[0][0] - self.clock())
+
+    def run_forever(self):
+        while True:
+            if self.run_next():
+                continue
+
+            delay = self.next_delay()
+            if delay is None:
+                logging.warning('no tasks scheduled')
+                return
+            logging.info('sleep %.1f sec until next task %s', delay, self._pending[0][2].name)
+            self.sleep(delay)
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import os
+import time
+
+import config
+
+SESSION_FILE = 'session.json'
+COOKIE_FIELDS = ('name', 'value', 'path', 'domain', 'secure', 'httpOnly', 'expiry')
+
+
+def _session_path():
+    return os.path.sep.join([config.STATE_DIR, SESSION_FILE])
+
+
+def load_session(host: str):
+    """saved session for host or None if missing, foreign or older than SESSION_MAX_AGE"""
+    try:
+        with open(_session_path()) as f:
+            session = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if session.get('host') != host:
+        logging.info('saved session for other host %s', session.get('host'))
+        return None
+    if time.time() - session.get('saved_at', 0) > config.SESSION_MAX_AGE:
+        logging.info('saved session too old')
+        return None
+    return session
+
+
+def save_session(host: str, cookies, ajax_token: str, pages: dict):
+    session = {
+        'host': host,
+        'saved_at': time.time(),
+        'cookies': [{k: c[k] for k in COOKIE_FIELDS if k in c} for c in cookies],
+        'ajax_token': ajax_token,
+        'pages': pages,
+    }
+    os.makedirs(config.STATE_DIR, exist_ok=True)
+    tmp_path = _session_path() + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(session, f)
+    os.replace(tmp_path, _session_path())
+
+
+def drop_session():
+    try:
+        os.remove(_session_path())
+    except OSError:
+        pass
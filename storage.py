@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sqlite3
+
+import config
+
+
+def open_db(name: str, schema: str):
+    """open sqlite database from state dir and apply schema (idempotent statements only)"""
+    os.makedirs(config.STATE_DIR, exist_ok=True)
+    conn = sqlite3.connect(os.path.sep.join([config.STATE_DIR, name]))
+    conn.row_factory = sqlite3.Row
+    conn.executescript(schema)
+    conn.commit()
+    return conn
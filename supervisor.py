@@ -0,0 +1,176 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""run several accounts, each Manager in its own worker process"""
+
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import time
+
+import config
+
+LOG_FORMAT = '%(asctime)s %(levelname)s: %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def available_memory_mb():
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def compute_pool_size(accounts_count: int):
+    limits = [accounts_count, os.cpu_count() or 1]
+    memory = available_memory_mb()
+    if memory is not None:
+        limits.append(memory // config.SUPERVISOR_WORKER_MEMORY_MB)
+    if config.SUPERVISOR_MAX_WORKERS:
+        limits.append(config.SUPERVISOR_MAX_WORKERS)
+    return max(1, min(limits))
+
+
+def run_account(profile, status_queue):
+    """worker entry point: apply account profile to config before Manager import"""
+    for key, value in profile.get('config', {}).items():
+        setattr(config, key, value)
+    config.HOST = profile.get('host', config.HOST)
+    config.METRICS_ACCOUNT = profile['name']
+    config.STATE_DIR = os.path.sep.join([config.STATE_DIR, profile['name']])
+
+    logging.basicConfig(format='%%(asctime)s %s %%(levelname)s: %%(message)s' % profile['name'],
+                        level=logging.INFO, datefmt=LOG_DATE_FORMAT)
+
+    # terminate from supervisor should close browser too
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+
+    import manage
+
+    def _on_task_done(task, ok):
+        status_queue.put({'account': profile['name'], 'task': task.name, 'ok': ok,
+                          'duration': task.last_duration, 'time': time.time()})
+
+    m = manage.Manager(*profile['creds'])
+    try:
+        m.run(on_task_done=_on_task_done)
+    except Exception as e:
+        logging.error('exception %s', e)
+        manage.send_desktop_notify('%s: ЙА УПАЛО =(' % profile['name'])
+        raise
+    finally:
+        m.close()
+
+
+class AccountStats(object):
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = time.time()
+        self.restarts = 0
+        self.tasks = 0
+        self.failures = 0
+        self.busy_time = 0.
+        self.last_seen = None
+
+    def update(self, status):
+        self.tasks += 1
+        self.failures += 0 if status['ok'] else 1
+        self.busy_time += status['duration']
+        self.last_seen = status['time']
+
+    def summary(self, alive):
+        hours = max(time.time() - self.started_at, 1.) / 3600.
+        heartbeat = '%ds ago' % (time.time() - self.last_seen) if self.last_seen else 'never'
+        return '%s %s: %d tasks (%.1f/h), %d failures, busy %.0f sec, %d restarts, last task %s' % (
+            self.name, 'alive' if alive else 'down', self.tasks, self.tasks / hours, self.failures,
+            self.busy_time, self.restarts, heartbeat)
+
+
+class Supervisor(object):
+
+    def __init__(self, accounts):
+        self.accounts = accounts
+        self.context = multiprocessing.get_context('spawn')
+        self.status_queue = self.context.Queue()
+        self.processes = {}
+        self.stats = {a['name']: AccountStats(a['name']) for a in accounts}
+        self.restart_at = {}
+
+    def _start(self, profile):
+        process = self.context.Process(target=run_account, args=(profile, self.status_queue),
+                                       name='manager-%s' % profile['name'], daemon=True)
+        process.start()
+        self.processes[profile['name']] = process
+        logging.info('start account %s pid %d', profile['name'], process.pid)
+
+    def _check_workers(self, active):
+        now = time.time()
+        for profile in active:
+            name = profile['name']
+            process = self.processes.get(name)
+            if process and process.is_alive():
+                continue
+            if process and name not in self.restart_at:
+                logging.warning('account %s worker exit code %s', name, process.exitcode)
+                self.restart_at[name] = now + config.SUPERVISOR_RESTART_DELAY
+            if not process or now >= self.restart_at.get(name, now):
+                if process:
+                    self.stats[name].restarts += 1
+                self.restart_at.pop(name, None)
+                self._start(profile)
+
+    def _drain_status(self, timeout):
+        try:
+            while True:
+                status = self.status_queue.get(timeout=timeout)
+                self.stats[status['account']].update(status)
+                timeout = 0
+        except queue.Empty:
+            pass
+
+    def report(self):
+        alive = 0
+        for name, stats in self.stats.items():
+            process = self.processes.get(name)
+            is_alive = bool(process and process.is_alive())
+            alive += int(is_alive)
+            logging.info(stats.summary(is_alive))
+        total_tasks = sum(s.tasks for s in self.stats.values())
+        total_failures = sum(s.failures for s in self.stats.values())
+        logging.info('accounts %d/%d alive, %d tasks, %d failures', alive, len(self.stats), total_tasks, total_failures)
+
+    def run(self):
+        # workers run forever: accounts beyond pool would never get a slot
+        pool_size = compute_pool_size(len(self.accounts))
+        if pool_size < len(self.accounts):
+            raise RuntimeError('%d accounts but only %d worker slots (cpu, memory or SUPERVISOR_MAX_WORKERS limit), '
+                               'not started: %s' % (len(self.accounts), pool_size,
+                                                    ', '.join(a['name'] for a in self.accounts[pool_size:])))
+        active = self.accounts
+        logging.info('supervisor pool size %d for %d accounts', pool_size, len(self.accounts))
+
+        next_report = time.time() + config.SUPERVISOR_REPORT_INTERVAL
+        try:
+            while True:
+                self._check_workers(active)
+                self._drain_status(timeout=1.)
+                if time.time() >= next_report:
+                    self.report()
+                    next_report = time.time() + config.SUPERVISOR_REPORT_INTERVAL
+        finally:
+            for process in self.processes.values():
+                process.terminate()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(format=LOG_FORMAT, level=logging.INFO, datefmt=LOG_DATE_FORMAT)
+    if not config.ACCOUNTS:
+        raise RuntimeError('ACCOUNTS is empty')
+    Supervisor(config.ACCOUNTS).run()
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+import config
+from config_utils import compute_autofarm_distances
+from map_planner import area_tiles, plan_map_queries, window_tiles
+
+
+def _covered(plan):
+    out = set()
+    for x, y, _ in plan:
+        out |= window_tiles(x, y, config.MAP_WINDOW_RADIUS)
+    return out
+
+
+def test_area_in_one_window_is_one_query():
+    for center in [(10, 20), (0, 0), (3, 7), (100, -50), (200, 200), (-199, 5)]:
+        target = area_tiles([center], config.MAP_WINDOW_RADIUS)
+        plan = plan_map_queries(target)
+        assert len(plan) == 1
+        assert target <= _covered(plan)
+
+
+def test_autofarm_areas_not_more_than_one_query_per_area():
+    for offset in (15, 20, 30, 40):
+        confs = compute_autofarm_distances(10, 20, offset, {})
+        centers = [(c['center_x'], c['center_y']) for c in confs]
+        target = area_tiles(centers, config.MAP_WINDOW_RADIUS)
+        plan = plan_map_queries(target, centers=centers)
+        assert len(plan) <= 9
+        assert target <= _covered(plan)
+
+
+def test_fresh_windows_are_skipped():
+    target = area_tiles([(10, 20)], config.MAP_WINDOW_RADIUS)
+    assert plan_map_queries(target, fresh_centers=[(10, 20)]) == []
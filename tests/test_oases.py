@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+import pytest
+
+import config
+from oases import OasisIndex, rank_with_rechecks
+
+STRONG = {'Bear': 20}  # inside default hero strength window
+ORIGIN = (0, 0)
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'STATE_DIR', str(tmp_path))
+    index = OasisIndex()
+    yield index
+    index.close()
+
+
+def _put_stale(index, coords, troops):
+    index.put(coords[0], coords[1], troops, time.time() - 2 * config.OASIS_STRENGTH_TTL)
+
+
+def _recheck(index, troops):
+    checked = []
+
+    def check(coords_list):
+        checked.append(list(coords_list))
+        for x, y in coords_list:
+            index.put(x, y, troops)
+    return check, checked
+
+
+def test_zero_rounds_ranks_without_checks(index):
+    _put_stale(index, (3, 4), STRONG)
+    check, checked = _recheck(index, STRONG)
+    ranked = rank_with_rechecks([(3, 4)], index, ORIGIN, 10., 1., check, rounds=0)
+    assert checked == []
+    assert [(coords, is_fresh) for _, coords, _, is_fresh in ranked] == [((3, 4), False)]
+
+
+def test_ranking_rebuilt_after_last_round(index):
+    _put_stale(index, (3, 4), STRONG)
+    check, checked = _recheck(index, STRONG)
+    ranked = rank_with_rechecks([(3, 4)], index, ORIGIN, 10., 1., check, rounds=1)
+    assert checked == [[(3, 4)]]
+    assert [(coords, is_fresh) for _, coords, _, is_fresh in ranked] == [((3, 4), True)]
+
+
+def test_recheck_stops_when_leaders_fresh(index):
+    _put_stale(index, (3, 4), STRONG)
+    check, checked = _recheck(index, STRONG)
+    rank_with_rechecks([(3, 4)], index, ORIGIN, 10., 1., check, rounds=3)
+    assert len(checked) == 1
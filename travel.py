@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""vectorized wrap-around distances and travel times (numpy arrays or scalars)"""
+
+import numpy as np
+
+import config
+
+
+def distances(x1, y1, x2, y2):
+    """euclidean distance on wrap-around map, arguments broadcast like numpy arrays"""
+    size = 2 * config.MAP_RADIUS + 1
+    dx = np.abs(np.asarray(x1) - np.asarray(x2)) % size
+    dy = np.abs(np.asarray(y1) - np.asarray(y2)) % size
+    return np.hypot(np.minimum(dx, size - dx), np.minimum(dy, size - dy))
+
+
+def distance_matrix(origins, targets):
+    """(N, 2) origins x (M, 2) targets -> (N, M) distances"""
+    origins = np.asarray(origins, dtype=np.int64).reshape(-1, 2)
+    targets = np.asarray(targets, dtype=np.int64).reshape(-1, 2)
+    return distances(origins[:, 0, None], origins[:, 1, None], targets[None, :, 0], targets[None, :, 1])
+
+
+def unit_speed(troop_id: str, tribe=None):
+    """fields per hour of unit t1..t10 (t11 is hero)"""
+    if troop_id == 't11':
+        return config.HERO_SPEED * config.SERVER_SPEED
+    speeds = config.UNIT_SPEEDS[tribe or config.TRIBE]
+    return speeds[int(troop_id[1:]) - 1] * config.SERVER_SPEED
+
+
+def army_speed(troops, tribe=None):
+    """slowest unit of {troop id: count} or None for empty army"""
+    speeds = [unit_speed(troop_id, tribe) for troop_id, count in troops.items() if count]
+    return min(speeds) if speeds else None
+
+
+def tournament_square_factor(village_name=None, with_hero=False):
+    """speed multiplier beyond TOURNAMENT_SQUARE_DISTANCE: tournament square level, hero boots only for
+    armies the hero travels with"""
+    level = config.TOURNAMENT_SQUARE_LEVELS.get(village_name, 0) if village_name else 0
+    boots = config.HERO_BOOTS_BONUS if with_hero else 0.
+    return 1. + level * config.TOURNAMENT_SQUARE_BONUS_PER_LEVEL + boots
+
+
+def travel_hours(distance, speed, factor=1.):
+    """one way hours: first TOURNAMENT_SQUARE_DISTANCE fields at base speed, rest multiplied by factor"""
+    distance = np.asarray(distance, dtype=np.float64)
+    speed = np.asarray(speed, dtype=np.float64)
+    near = np.minimum(distance, config.TOURNAMENT_SQUARE_DISTANCE)
+    far = distance - near
+    return near / speed + far / (speed * factor)
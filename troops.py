@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""troop training plan from troops overview matrix"""
+
+import logging
+
+
+def unit_index(troop_id: str) -> int:
+    """'t4' -> column 3 of troops overview"""
+    return int(troop_id[1:]) - 1
+
+
+def unit_count(matrix, village, troop_id, kind='total'):
+    counts = matrix.get(village, {}).get(kind)
+    if counts is None:
+        return None
+    index = unit_index(troop_id)
+    return counts[index] if index < len(counts) else 0
+
+
+def plan_troop_orders(matrix, build_config):
+    """[{village, conf, total, training}, ...] for entries below troop_max and with free queue"""
+    orders = []
+    for village, configs in build_config.items():
+        if village not in matrix:
+            logging.warning('village %s not found in troops overview', village)
+            continue
+        for conf in configs:
+            total = unit_count(matrix, village, conf['troop_id'])
+            home = unit_count(matrix, village, conf['troop_id'], 'home')
+            training = unit_count(matrix, village, conf['troop_id'], 'training')
+            logging.info('%s %s: total %s, at home %s, away %s, training %s', village, conf['troop_id'], total, home,
+                         total - home if home is not None else None, training)
+
+            if total + (training or 0) >= conf['troop_max']:
+                logging.info('total already max')
+                continue
+            if training is not None and training >= conf['troop_queue_max']:
+                logging.info('queue is full')
+                continue
+            orders.append({'village': village, 'conf': conf, 'total': total, 'training': training})
+    return orders
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""own villages registry: newdid, coordinates and building slots, kept in state dir"""
+
+import json
+import logging
+import os
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import config
+
+REGISTRY_FILE = 'villages.json'
+
+
+def with_newdid(url: str, newdid: int) -> str:
+    """same page with village switch parameter"""
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query) if k != 'newdid']
+    query.append(('newdid', str(newdid)))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+class VillageRegistry(object):
+    """name -> {name, newdid, x, y, buildings: {gid: slot id}, units: {troop id: gid}}"""
+
+    def __init__(self):
+        self.path = os.path.sep.join([config.STATE_DIR, REGISTRY_FILE])
+        self.villages = {}
+        self.updated_at = 0
+        # unknown until first select or refresh
+        self.active = None
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            self.villages = data['villages']
+            self.updated_at = data['updated_at']
+            for v in self.villages.values():
+                v['buildings'] = {int(gid): slot for gid, slot in v['buildings'].items()}
+        except (OSError, ValueError, KeyError):
+            pass
+        logging.info('village registry loaded %d villages', len(self.villages))
+
+    def is_stale(self):
+        return not self.villages or time.time() - self.updated_at > config.VILLAGE_REGISTRY_MAX_AGE
+
+    def update_villages(self, records):
+        """replace village list from parsed sidebar, keep known buildings"""
+        villages = {}
+        for r in records:
+            old = self.villages.get(r['name'], {})
+            villages[r['name']] = {'name': r['name'], 'newdid': r['newdid'], 'x': r['x'], 'y': r['y'],
+                                   'buildings': old.get('buildings', {}), 'units': old.get('units', {})}
+            if r['active']:
+                self.active = r['name']
+        self.villages = villages
+
+    def set_buildings(self, name: str, buildings: dict):
+        self.villages[name]['buildings'] = buildings
+
+    def set_unit_building(self, name: str, troop_id: str, gid: int):
+        self.villages[name]['units'][troop_id] = gid
+        self.save()
+
+    def mark_updated(self):
+        self.updated_at = time.time()
+        self.save()
+
+    def save(self):
+        os.makedirs(config.STATE_DIR, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'updated_at': self.updated_at, 'villages': self.villages}, f)
+        os.replace(tmp_path, self.path)
+
+    def get(self, name: str):
+        """village by exact name, then by substring (sidebar search compatibility)"""
+        if name in self.villages:
+            return self.villages[name]
+        for village_name, village in self.villages.items():
+            if name in village_name:
+                return village
+        return None
+
+    def building_url(self, name: str, gid: int):
+        village = self.get(name)
+        slot = village['buildings'].get(gid) if village else None
+        if not slot:
+            return None
+        return '%s/build.php?%s' % (config.HOST, urlencode([('newdid', village['newdid']), ('id', slot)]))
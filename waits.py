@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException, WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+
+import config
+
+# conditions go through javascript so implicit find timeout does not stretch polling
+PAGE_READY_SCRIPT = "return document.readyState === 'complete';"
+AJAX_IDLE_SCRIPT = ("return document.readyState === 'complete'"
+                    " && (!window.jQuery || window.jQuery.active === 0)"
+                    " && (!window.Ajax || !window.Ajax.activeRequestCount);")
+XPATH_PRESENT_SCRIPT = ("return document.evaluate(arguments[0], document, null, "
+                        "XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue !== null;")
+DIALOG_CLOSED_SCRIPT = "return document.getElementById('dialogCancelButton') === null;"
+
+
+def page_ready(driver):
+    return driver.execute_script(PAGE_READY_SCRIPT)
+
+
+def ajax_idle(driver):
+    return driver.execute_script(AJAX_IDLE_SCRIPT)
+
+
+def dialog_closed(driver):
+    return driver.execute_script(DIALOG_CLOSED_SCRIPT)
+
+
+def xpath_present(xpath):
+    def _condition(driver):
+        return driver.execute_script(XPATH_PRESENT_SCRIPT, xpath)
+    return _condition
+
+
+def url_changed(old_url):
+    def _condition(driver):
+        return driver.current_url != old_url
+    return _condition
+
+
+def page_reloaded(elem):
+    """element from previous document detached and new document loaded"""
+    def _condition(driver):
+        try:
+            elem.is_enabled()
+            return False
+        except StaleElementReferenceException:
+            return page_ready(driver)
+    return _condition
+
+
+class Waiter(object):
+    """explicit readiness waits capped by timeout, with per-label timing stats"""
+
+    def __init__(self, driver, timeout=config.CUSTOM_WAIT_TIMEOUT, poll=config.WAIT_POLL_INTERVAL):
+        self.driver = driver
+        self.timeout = timeout
+        self.poll = poll
+        self.stats = {}
+
+    def until(self, condition, label: str):
+        started = time.time()
+        result = False
+        try:
+            result = WebDriverWait(self.driver, self.timeout, self.poll,
+                                   ignored_exceptions=(WebDriverException,)).until(condition)
+        except TimeoutException:
+            logging.warning('wait %s timeout %d sec', label, self.timeout)
+
+        elapsed = time.time() - started
+        count, total, timeouts = self.stats.get(label, (0, 0., 0))
+        self.stats[label] = (count + 1, total + elapsed, timeouts + (0 if result else 1))
+        logging.debug('wait %s took %.2f sec', label, elapsed)
+        return result
+
+    def page_ready(self):
+        return self.until(page_ready, 'page ready')
+
+    def ajax_idle(self):
+        return self.until(ajax_idle, 'ajax idle')
+
+    def dialog_closed(self):
+        return self.until(dialog_closed, 'dialog closed')
+
+    def element(self, xpath: str, label: str):
+        return self.until(xpath_present(xpath), label)
+
+    def url_changed(self, old_url: str, label: str):
+        return self.until(url_changed(old_url), label)
+
+    def reloaded(self, elem, label: str):
+        return self.until(page_reloaded(elem), label)
+
+    def pop_summary(self):
+        """wait stats since previous call: label -> (count, total seconds, timeouts)"""
+        summary, self.stats = self.stats, {}
+        return summary